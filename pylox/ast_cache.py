@@ -0,0 +1,163 @@
+import hashlib
+import os
+import pickle
+import stat
+import sys
+from stmt import Stmt
+
+"""
+On-disk cache of resolved syntax trees, in the spirit of __pycache__: the
+tree of a script is pickled to the user's cache directory, so running an
+unchanged script again skips scanning, parsing and resolving.
+
+Loading an entry unpickles it, which can run arbitrary code. Entries are
+therefore only kept in a directory of the user's own, and only loaded when
+nobody else could have written them.
+"""
+
+MAGIC = b"LOXC"
+
+# Trees bigger than this aren't cached. Once a cache directory holds more
+# than MAX_CACHE_SIZE bytes, the least recently used entries are evicted.
+MAX_ENTRY_SIZE = 32 * 1024 * 1024
+MAX_CACHE_SIZE = 128 * 1024 * 1024
+
+# The modules that define the cached trees. A change to any of them
+# invalidates every cache entry.
+TREE_MODULES = [
+    "expr.py",
+    "stmt.py",
+    "parser_class.py",
+    "resolver.py",
+    "optimizer.py",
+    "token_class.py",
+    "token_type.py",
+    "token_type_instances.py",
+    "ast_cache.py",
+]
+
+version: bytes | None = None
+
+
+def interpreter_version() -> bytes:
+    global version
+    if version is None:
+        digest = hashlib.sha256(
+            repr((sys.version_info, pickle.HIGHEST_PROTOCOL)).encode()
+        )
+        directory = os.path.dirname(os.path.abspath(__file__))
+        for name in TREE_MODULES:
+            module_file = open(os.path.join(directory, name), "rb")
+            digest.update(module_file.read(-1))
+            module_file.close()
+        version = digest.digest()
+
+    return version
+
+
+def source_key(source: str) -> bytes:
+    digest = hashlib.sha256(interpreter_version())
+    digest.update(source.encode("utf-8", "surrogatepass"))
+    return digest.digest()
+
+
+def cache_directory() -> str:
+    # $XDG_CACHE_HOME/pylox, by default ~/.cache/pylox.
+    base = os.environ.get("XDG_CACHE_HOME", "")
+    if base == "":
+        base = os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "pylox")
+
+
+def cache_path(script: str) -> str:
+    # Named after the script's full path, scripts in different directories
+    # may share a name.
+    path = os.path.abspath(script)
+    digest = hashlib.sha256(path.encode("utf-8", "surrogatepass")).hexdigest()
+    name = os.path.basename(path) + "-" + digest[:16] + ".loxc"
+    return os.path.join(cache_directory(), name)
+
+
+def private(path: str, kind: int) -> bool:
+    # Whether path is a file or directory of the given kind, not a link,
+    # owned by this user and writable by nobody else.
+    try:
+        info = os.lstat(path)
+    except OSError:
+        return False
+
+    if stat.S_IFMT(info.st_mode) != kind or info.st_mode & 0o022 != 0:
+        return False
+    return not hasattr(os, "getuid") or info.st_uid == os.getuid()
+
+
+def load(script: str, key: bytes) -> list[Stmt] | None:
+    path = cache_path(script)
+    if not private(os.path.dirname(path), stat.S_IFDIR):
+        return None
+    if not private(path, stat.S_IFREG):
+        return None
+
+    try:
+        cache_file = open(path, "rb")
+    except OSError:
+        return None
+
+    data = cache_file.read(-1)
+    cache_file.close()
+    if data[: len(MAGIC)] != MAGIC or data[len(MAGIC) : len(MAGIC) + 32] != key:
+        return None
+
+    try:
+        statements = pickle.loads(data[len(MAGIC) + 32 :])
+    except Exception:
+        # Truncated or otherwise unreadable entry, parse the source again.
+        return None
+
+    try:
+        os.utime(path)  # Recently used, see evict().
+    except OSError:
+        pass
+
+    return statements
+
+
+def store(script: str, key: bytes, statements: list[Stmt]) -> None:
+    try:
+        data = pickle.dumps(statements, pickle.HIGHEST_PROTOCOL)
+    except RecursionError:
+        return  # Too deeply nested to pickle.
+
+    if len(data) > MAX_ENTRY_SIZE:
+        return
+
+    path = cache_path(script)
+    try:
+        os.makedirs(os.path.dirname(path), 0o700, exist_ok=True)
+        # Written aside and renamed, so a concurrent run never reads half an
+        # entry.
+        temporary = path + "." + str(os.getpid())
+        flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+        cache_file = os.fdopen(os.open(temporary, flags, 0o600), "wb")
+        cache_file.write(MAGIC + key + data)
+        cache_file.close()
+        os.replace(temporary, path)
+        evict(os.path.dirname(path))
+    except OSError:
+        pass  # A read-only directory just means no caching.
+
+
+def evict(directory: str) -> None:
+    entries: list[tuple[float, int, str]] = []
+    for name in os.listdir(directory):
+        if name.endswith(".loxc"):
+            info = os.stat(os.path.join(directory, name))
+            entries.append((info.st_mtime, info.st_size, name))
+
+    total = sum(size for _, size, _ in entries)
+    entries.sort()
+    for _, size, name in entries:
+        if total <= MAX_CACHE_SIZE:
+            break
+        os.remove(os.path.join(directory, name))
+        total -= size
@@ -0,0 +1,173 @@
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+import env
+import error
+import lox
+import lox_callable
+import output
+
+"""
+Batch runner: runs many Lox scripts on a pool of worker processes, so the
+Python startup and the interpreter's imports are paid once per worker
+instead of once per script. Every job starts from fresh globals and error
+flags, its output is captured and its exit code is the one lox.py would
+have exited with (0, 65 or 70).
+"""
+
+
+def read_manifest(path: str) -> list[str]:
+    # One script per line, relative to the manifest. Blank lines and lines
+    # starting with # are skipped.
+    directory = os.path.dirname(path)
+    manifest_file = open(path, "r")
+    lines = manifest_file.read(-1).splitlines()
+    manifest_file.close()
+
+    scripts: list[str] = []
+    for line in lines:
+        line = line.strip()
+        if line != "" and not line.startswith("#"):
+            scripts.append(os.path.join(directory, line))
+
+    return scripts
+
+
+def configure(caching: bool) -> None:
+    # Runs once in every worker.
+    lox.caching = caching
+
+
+def reset(captured: io.StringIO) -> None:
+    globals = env.Environment()
+    lox_callable.define_natives(globals)
+    env.state.set(env.State(globals))
+    error.flags.set(error.Flags())
+    output.sink.set(output.OutputSink(captured, "exit"))
+
+
+def run_job(script: str, backend: str) -> dict[str, object]:
+    captured = io.StringIO()
+    errors = io.StringIO()
+    reset(captured)
+
+    exit_code = 0
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(captured), contextlib.redirect_stderr(errors):
+        try:
+            lox.run_file(script, backend)
+        except SystemExit as status:
+            exit_code = status.code if isinstance(status.code, int) else 1
+        except Exception:
+            # Like an uncaught exception in lox.py.
+            traceback.print_exc()
+            exit_code = 1
+        output.flush()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "script": script,
+        "exit": exit_code,
+        "seconds": elapsed,
+        "stdout": captured.getvalue(),
+        "stderr": errors.getvalue(),
+    }
+
+
+def run_batch(
+    scripts: list[str], backend: str, workers: int | None, caching: bool = True
+) -> list[dict[str, object]]:
+    with ProcessPoolExecutor(
+        workers, initializer=configure, initargs=(caching,)
+    ) as pool:
+        return list(pool.map(run_job, scripts, [backend] * len(scripts)))
+
+
+def output_name(index: int, script: str) -> str:
+    # Numbered, scripts in different directories may share a name.
+    return str(index).rjust(4, "0") + "-" + os.path.basename(script) + ".out"
+
+
+def usage() -> None:
+    options = "[--" + "|--".join(lox.backends[1:]) + "] [--jobs=N] [--no-cache]"
+    options += " [--manifest=FILE] [--output-dir=DIR] [--json=FILE]"
+    print("Usage: python batch.py " + options + " [script ...]")
+    sys.exit(64)
+
+
+if __name__ == "__main__":
+    backend = "tree"
+    workers: int | None = None
+    caching = True
+    output_dir: str | None = None
+    json_path: str | None = None
+    scripts: list[str] = []
+
+    for arg in sys.argv[1:]:
+        if arg[2:] in lox.backends:
+            backend = arg[2:]
+        elif arg.startswith("--jobs=") and arg[len("--jobs=") :].isdigit():
+            workers = int(arg[len("--jobs=") :])
+        elif arg == "--no-cache":
+            caching = False
+        elif arg.startswith("--manifest="):
+            scripts += read_manifest(arg[len("--manifest=") :])
+        elif arg.startswith("--output-dir="):
+            output_dir = arg[len("--output-dir=") :]
+        elif arg.startswith("--json="):
+            json_path = arg[len("--json=") :]
+        elif arg.startswith("--"):
+            usage()
+        else:
+            scripts.append(arg)
+
+    if len(scripts) == 0 or workers == 0:
+        usage()
+
+    start = time.perf_counter()
+    results = run_batch(scripts, backend, workers, caching)
+    wall = time.perf_counter() - start
+
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+        for index, result in enumerate(results):
+            path = os.path.join(output_dir, output_name(index, str(result["script"])))
+            output_file = open(path, "w")
+            output_file.write(str(result["stdout"]))
+            output_file.close()
+
+    sys.stdout.write("exit".rjust(4) + "ms".rjust(10) + "  script\n")
+    for result in results:
+        sys.stdout.write(str(result["exit"]).rjust(4))
+        sys.stdout.write(format(float(result["seconds"]) * 1000, ".1f").rjust(10))  # type: ignore
+        sys.stdout.write("  " + str(result["script"]) + "\n")
+
+    failed = sum(1 for result in results if result["exit"] != 0)
+    busy = sum(float(result["seconds"]) for result in results)  # type: ignore
+    sys.stdout.write(
+        "\n"
+        + str(len(results))
+        + " jobs, "
+        + str(failed)
+        + " failed, "
+        + format(wall, ".2f")
+        + " s wall, "
+        + format(busy, ".2f")
+        + " s in jobs, "
+        + format(len(results) / wall, ".1f")
+        + " jobs/s\n"
+    )
+
+    if json_path is not None:
+        json_file = open(json_path, "w")
+        json.dump(
+            {"backend": backend, "wall": wall, "jobs": results}, json_file, indent=2
+        )
+        json_file.close()
+
+    sys.exit(0 if failed == 0 else 1)
@@ -0,0 +1,180 @@
+import hashlib
+import json
+import os
+import platform
+import sys
+import time
+import env
+import error
+import lox
+import lox_callable
+import output
+from regex_scanner import RegexScanner
+
+"""
+Runtime benchmark harness. Each program in benchmarks/ is run on each
+backend, timing scanning, parsing (which includes resolving and
+optimizing) and execution (which includes the backend's own compilation)
+separately. Programs run with fresh globals and their output discarded.
+"""
+
+BENCHMARKS = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks"
+)
+PHASES = ["scan", "parse", "exec"]
+
+
+def find_programs(names: list[str]) -> list[str]:
+    if len(names) == 0:
+        names = sorted(name for name in os.listdir(BENCHMARKS) if name.endswith(".lox"))
+
+    paths: list[str] = []
+    for name in names:
+        if os.path.exists(name):
+            paths.append(name)
+        elif os.path.exists(os.path.join(BENCHMARKS, name)):
+            paths.append(os.path.join(BENCHMARKS, name))
+        else:
+            paths.append(os.path.join(BENCHMARKS, name + ".lox"))
+
+    return paths
+
+
+def reset() -> None:
+    globals = env.Environment()
+    lox_callable.define_natives(globals)
+    env.state.set(env.State(globals))
+    error.flags.set(error.Flags())
+
+
+def interpreter_version() -> str:
+    # Hash of the interpreter's sources, to tell apart runs of different trees.
+    digest = hashlib.sha256()
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".py"):
+            module_file = open(os.path.join(directory, name), "rb")
+            digest.update(module_file.read(-1))
+            module_file.close()
+
+    return digest.hexdigest()[:12]
+
+
+def run_once(source: str, backend: str) -> dict[str, float]:
+    reset()
+    start = time.perf_counter()
+    tokens = lox.scanner_class(source).scan_tokens()
+    scanned = time.perf_counter()
+    statements = lox.parse(tokens)
+    parsed = time.perf_counter()
+    if error.flags.get().had_error:
+        raise ValueError("The program has compile errors.")
+    try:
+        lox.execute(statements, backend)
+    except RuntimeError:
+        raise ValueError("The program failed with a runtime error.")
+    output.flush()
+    executed = time.perf_counter()
+
+    return {
+        "scan": scanned - start,
+        "parse": parsed - scanned,
+        "exec": executed - parsed,
+    }
+
+
+def measure(path: str, backend: str, repeat: int, warmup: int) -> dict[str, object]:
+    source_file = open(path, "r")
+    source = source_file.read(-1)
+    source_file.close()
+
+    for _ in range(warmup):
+        run_once(source, backend)
+    samples = [run_once(source, backend) for _ in range(repeat)]
+
+    result: dict[str, object] = {
+        "program": os.path.basename(path),
+        "backend": backend,
+    }
+    for phase in PHASES:
+        times = [sample[phase] for sample in samples]
+        result[phase] = {
+            "min": min(times),
+            "mean": sum(times) / len(times),
+            "samples": times,
+        }
+
+    return result
+
+
+def milliseconds(seconds: float) -> str:
+    return format(seconds * 1000, ".1f").rjust(10)
+
+
+def usage() -> None:
+    options = "[--repeat=N] [--warmup=N] [--backends=tree,vm,...] [--json[=FILE]]"
+    print("Usage: python bench.py " + options + " [program ...]")
+    sys.exit(64)
+
+
+if __name__ == "__main__":
+    repeat = 5
+    warmup = 1
+    backends = lox.backends
+    json_path: str | None = None
+    names: list[str] = []
+
+    for arg in sys.argv[1:]:
+        if arg.startswith("--repeat="):
+            repeat = int(arg[len("--repeat=") :])
+        elif arg.startswith("--warmup="):
+            warmup = int(arg[len("--warmup=") :])
+        elif arg.startswith("--backends="):
+            backends = arg[len("--backends=") :].split(",")
+        elif arg == "--json":
+            json_path = "-"
+        elif arg.startswith("--json="):
+            json_path = arg[len("--json=") :]
+        elif arg.startswith("--"):
+            usage()
+        else:
+            names.append(arg)
+
+    if repeat < 1 or any(backend not in lox.backends for backend in backends):
+        usage()
+
+    lox.scanner_class = RegexScanner
+    # Program output is thrown away, it would only measure the terminal.
+    output.sink.set(output.OutputSink(open(os.devnull, "w"), "exit"))
+
+    results: list[dict[str, object]] = []
+    report = sys.stdout if json_path != "-" else sys.stderr
+    report.write("program".ljust(22) + "backend".ljust(9))
+    report.write("".join((phase + " ms").rjust(10) for phase in PHASES) + "\n")
+    for path in find_programs(names):
+        for backend in backends:
+            result = measure(path, backend, repeat, warmup)
+            results.append(result)
+            report.write(str(result["program"]).ljust(22) + backend.ljust(9))
+            for phase in PHASES:
+                report.write(milliseconds(result[phase]["min"]))  # type: ignore
+            report.write("\n")
+            report.flush()
+
+    if json_path is not None:
+        document = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "interpreter": interpreter_version(),
+            "scanner": lox.scanner_class.__name__,
+            "repeat": repeat,
+            "warmup": warmup,
+            "results": results,
+        }
+        if json_path == "-":
+            json.dump(document, sys.stdout, indent=2)
+            sys.stdout.write("\n")
+        else:
+            json_file = open(json_path, "w")
+            json.dump(document, json_file, indent=2)
+            json_file.close()
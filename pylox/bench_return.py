@@ -0,0 +1,98 @@
+import os
+import sys
+import time
+import env
+import lox
+import output
+import stmt
+from bench import BENCHMARKS, reset
+from regex_scanner import RegexScanner
+
+"""
+Call throughput of recursive fib on the tree-walker, with return
+implemented as it is (a completion value handed up by every statement)
+and, for comparison, with the usual exception raised by the return
+statement and caught in LoxFunction.call.
+"""
+
+
+class ReturnException(Exception):
+    def __init__(self, value: object) -> None:
+        self.value: object = value
+
+
+def raising_return(self: stmt.Return) -> None:
+    value = None if self.value is None else self.value.interpret()
+    raise ReturnException(value)
+
+
+def catching_call(self: stmt.LoxFunction, arguments: list[object]) -> object:
+    locals_count = self.declaration.size - len(arguments)
+    frame = env.Frame(arguments + [None] * locals_count, env.state.get().globals)
+    try:
+        stmt.execute_block(self.declaration.body, frame)
+    except ReturnException as returned:
+        return returned.value
+    return None
+
+
+def count_calls(statements: list[stmt.Stmt]) -> int:
+    calls = 0
+    original = stmt.LoxFunction.call
+
+    def counting_call(self: stmt.LoxFunction, arguments: list[object]) -> object:
+        nonlocal calls
+        calls += 1
+        return original(self, arguments)
+
+    stmt.LoxFunction.call = counting_call  # type: ignore
+    try:
+        reset()
+        lox.execute(statements, "tree")
+    finally:
+        stmt.LoxFunction.call = original  # type: ignore
+    return calls
+
+
+def best_time(statements: list[stmt.Stmt], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        reset()
+        start = time.perf_counter()
+        lox.execute(statements, "tree")
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+if __name__ == "__main__":
+    repeat = 5
+    for arg in sys.argv[1:]:
+        if arg.startswith("--repeat="):
+            repeat = int(arg[len("--repeat=") :])
+        else:
+            print("Usage: python bench_return.py [--repeat=N]")
+            sys.exit(64)
+
+    output.sink.set(output.OutputSink(open(os.devnull, "w"), "exit"))
+    source_file = open(os.path.join(BENCHMARKS, "fib.lox"), "r")
+    statements = lox.parse(RegexScanner(source_file.read(-1)).scan_tokens())
+    source_file.close()
+    calls = count_calls(statements)
+
+    completion = best_time(statements, repeat)
+
+    originals = (stmt.Return.interpret, stmt.LoxFunction.call)
+    stmt.Return.interpret = raising_return  # type: ignore
+    stmt.LoxFunction.call = catching_call  # type: ignore
+    try:
+        exception = best_time(statements, repeat)
+    finally:
+        stmt.Return.interpret, stmt.LoxFunction.call = originals  # type: ignore
+
+    print("fib.lox: " + str(calls) + " calls, best of " + str(repeat))
+    for design, seconds in (("completion", completion), ("exception", exception)):
+        rate = format(calls / seconds / 1000, ".1f") + "k calls/s"
+        print(
+            design.ljust(12) + format(seconds * 1000, ".1f").rjust(8) + " ms  " + rate
+        )
@@ -0,0 +1,54 @@
+import os
+import sys
+import time
+from scanner import Scanner
+from regex_scanner import RegexScanner
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "examples")
+
+
+def example_source(size: int) -> str:
+    # All the examples concatenated and repeated up to about size bytes.
+    text = ""
+    for name in sorted(os.listdir(EXAMPLES)):
+        if name.endswith(".lox"):
+            file_handler = open(os.path.join(EXAMPLES, name), "r")
+            text += file_handler.read(-1) + "\n"
+            file_handler.close()
+
+    return text * (size // len(text) + 1)
+
+
+def throughput(scanner_class: type, source: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        scanner_class(source).scan_tokens()
+        best = min(best, time.perf_counter() - start)
+
+    return len(source.encode("utf-8")) / best / 1_000_000
+
+
+if __name__ == "__main__":
+    paths = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    repeat = 5
+    for arg in sys.argv[1:]:
+        if arg.startswith("--repeat="):
+            repeat = int(arg[len("--repeat=") :])
+
+    if len(paths) > 1:
+        print("Usage: python bench_scanner.py [--repeat=N] [script]")
+        sys.exit(64)
+
+    if len(paths) == 1:
+        file_handler = open(paths[0], "r")
+        source = file_handler.read(-1)
+        file_handler.close()
+    else:
+        source = example_source(1_000_000)
+
+    size = len(source.encode("utf-8")) / 1_000_000
+    print("input: " + format(size, ".2f") + " MB, best of " + str(repeat))
+    for scanner_class in (Scanner, RegexScanner):
+        speed = throughput(scanner_class, source, repeat)
+        print(scanner_class.__name__.ljust(14) + format(speed, ".2f") + " MB/s")
@@ -0,0 +1,34 @@
+class Chunk:
+    def __init__(self) -> None:
+        self.code: list[int] = []
+        self.constants: list[object] = []
+        # Source line of every entry in code, operands included.
+        self.lines: list[int] = []
+        self.constant_index: dict[tuple[type, object], int] = {}
+        # Names of the globals the code reads and writes.
+        self.names: list[str] = []
+        self.name_index: dict[str, int] = {}
+
+    def write(self, byte: int, line: int) -> None:
+        self.code.append(byte)
+        self.lines.append(line)
+
+    def add_constant(self, value: object) -> int:
+        # Keyed by type too, otherwise 1.0 and True would share an entry.
+        key = (type(value), value)
+        index = self.constant_index.get(key)
+        if index is None:
+            index = len(self.constants)
+            self.constants.append(value)
+            self.constant_index[key] = index
+
+        return index
+
+    def add_name(self, name: str) -> int:
+        index = self.name_index.get(name)
+        if index is None:
+            index = len(self.names)
+            self.names.append(name)
+            self.name_index[name] = index
+
+        return index
@@ -0,0 +1,733 @@
+from typing import Callable
+import error
+import env
+import output
+import expr
+import stmt
+import token_type_instances as TT
+from env import Frame
+from expr import Expr
+from stmt import Stmt
+from token_class import Token
+from lox_callable import LoxCallable
+from rope import STRINGS, concat
+
+ExprFn = Callable[[Frame], object]
+# Statement functions that can end in a return (see returns()) give back a
+# stmt.Completion; what the others return is meaningless.
+StmtFn = Callable[[Frame], object]
+
+
+class ClosureFunction(LoxCallable):
+    def __init__(self, declaration: stmt.Function, body: tuple[StmtFn, ...]) -> None:
+        self.name: str = declaration.name.lexeme
+        self.param_count: int = len(declaration.params)
+        self.padding: list[object] = [None] * (declaration.size - self.param_count)
+        self.body: tuple[StmtFn, ...] = body
+        self.checked: tuple[tuple[StmtFn, bool], ...] | None = None
+        if any(returns(statement) for statement in declaration.body):
+            self.checked = checked(body, declaration.body)
+
+    def call(self, arguments: list[object]) -> object:
+        frame = Frame(arguments + self.padding, env.state.get().globals)
+        if self.checked is None:
+            for statement in self.body:
+                statement(frame)
+            return None
+
+        for statement, returning in self.checked:
+            completion = statement(frame)
+            if returning and completion is not None:
+                return completion[0]  # type: ignore
+        return None
+
+    def arity(self) -> int:
+        return self.param_count
+
+    def __str__(self) -> str:
+        return "<fn " + self.name + ">"
+
+
+def compile_program(statements: list[Stmt]) -> tuple[StmtFn, ...]:
+    """
+    Turns every node of a resolved AST into a Python closure, once. Operator
+    dispatch and variable addressing are decided here, so running the
+    program costs one call per node and no match statements.
+    """
+    return tuple(compile_stmt(statement) for statement in statements)
+
+
+# ------------------------- STATEMENTS -------------------------
+
+
+def returns(statement: Stmt) -> bool:
+    # Whether running the statement can end in a return.
+    match statement:
+        case stmt.Return():
+            return True
+        case stmt.Block():
+            return any(returns(inner) for inner in statement.statements)
+        case stmt.If():
+            if statement.else_branch is not None and returns(statement.else_branch):
+                return True
+            return returns(statement.then_branch)
+        case stmt.While() | stmt.For():
+            return returns(statement.body)
+
+    return False
+
+
+def checked(
+    compiled: tuple[StmtFn, ...], statements: list[Stmt]
+) -> tuple[tuple[StmtFn, bool], ...]:
+    # Pairs each statement function with whether its result must be checked.
+    return tuple(zip(compiled, [returns(statement) for statement in statements]))
+
+
+def compile_stmt(statement: Stmt) -> StmtFn:
+    match statement:
+        case stmt.ExpressionStmt():
+            return compile_expr(statement.expression)
+        case stmt.Print():
+            return print_stmt(compile_expr(statement.expression))
+        case stmt.Var():
+            return var_stmt(statement)
+        case stmt.Block():
+            return block_stmt(statement)
+        case stmt.If():
+            return if_stmt(statement)
+        case stmt.While():
+            return while_stmt(
+                compile_expr(statement.condition),
+                compile_stmt(statement.body),
+                returns(statement.body),
+            )
+        case stmt.Return():
+            return return_stmt(statement)
+        case stmt.For():
+            return for_stmt(statement)
+        case stmt.Function():
+            return function_stmt(statement)
+
+    raise ValueError("Unknown statement type '" + statement.__class__.__name__ + "'.")
+
+
+def print_stmt(expression: ExprFn) -> StmtFn:
+    stringify = expr.stringify
+
+    def execute(environment: Frame) -> None:
+        output.sink.get().write_line(stringify(expression(environment)))
+
+    return execute
+
+
+def var_stmt(statement: stmt.Var) -> StmtFn:
+    initializer = literal(None)
+    if statement.initializer is not None:
+        initializer = compile_expr(statement.initializer)
+
+    if statement.slot is None:
+        name = statement.name.lexeme
+        global_values = env.state.get().globals.values
+
+        def execute_global(environment: Frame) -> None:
+            global_values[name] = initializer(environment)
+
+        return execute_global
+
+    slot = statement.slot
+
+    def execute(environment: Frame) -> None:
+        environment.values[slot] = initializer(environment)
+
+    return execute
+
+
+def block_stmt(statement: stmt.Block) -> StmtFn:
+    statements = compile_program(statement.statements)
+    size = statement.size
+    scoped = statement.scoped
+
+    if returns(statement):
+        pairs = checked(statements, statement.statements)
+
+        def execute_returning(environment: Frame) -> object:
+            if scoped:
+                environment = Frame([None] * size, environment)
+            for inner_statement, returning in pairs:
+                completion = inner_statement(environment)
+                if returning and completion is not None:
+                    return completion
+            return None
+
+        return execute_returning
+
+    if not scoped:
+
+        def execute_unscoped(environment: Frame) -> None:
+            for inner_statement in statements:
+                inner_statement(environment)
+
+        return execute_unscoped
+
+    def execute(environment: Frame) -> None:
+        inner = Frame([None] * size, environment)
+        for inner_statement in statements:
+            inner_statement(inner)
+
+    return execute
+
+
+def if_stmt(statement: stmt.If) -> StmtFn:
+    condition = compile_expr(statement.condition)
+    then_branch = compile_stmt(statement.then_branch)
+
+    if returns(statement):
+        return if_returning(statement, condition, then_branch)
+
+    if statement.else_branch is None:
+
+        def execute_then(environment: Frame) -> None:
+            value = condition(environment)
+            if value is not None and value is not False:
+                then_branch(environment)
+
+        return execute_then
+
+    else_branch = compile_stmt(statement.else_branch)
+
+    def execute(environment: Frame) -> None:
+        value = condition(environment)
+        if value is not None and value is not False:
+            then_branch(environment)
+        else:
+            else_branch(environment)
+
+    return execute
+
+
+def if_returning(statement: stmt.If, condition: ExprFn, then_branch: StmtFn) -> StmtFn:
+    then_returns = returns(statement.then_branch)
+    else_branch: StmtFn | None = None
+    else_returns = False
+    if statement.else_branch is not None:
+        else_branch = compile_stmt(statement.else_branch)
+        else_returns = returns(statement.else_branch)
+
+    def execute(environment: Frame) -> object:
+        value = condition(environment)
+        if value is not None and value is not False:
+            completion = then_branch(environment)
+            return completion if then_returns else None
+        if else_branch is not None:
+            completion = else_branch(environment)
+            return completion if else_returns else None
+        return None
+
+    return execute
+
+
+def while_stmt(condition: ExprFn, body: StmtFn, body_returns: bool) -> StmtFn:
+    if body_returns:
+
+        def execute_returning(environment: Frame) -> object:
+            value = condition(environment)
+            while value is not None and value is not False:
+                completion = body(environment)
+                if completion is not None:
+                    return completion
+                value = condition(environment)
+            return None
+
+        return execute_returning
+
+    def execute(environment: Frame) -> None:
+        value = condition(environment)
+        while value is not None and value is not False:
+            body(environment)
+            value = condition(environment)
+
+    return execute
+
+
+def for_stmt(statement: stmt.For) -> StmtFn:
+    def nothing(environment: Frame) -> object:
+        return None
+
+    def forever(environment: Frame) -> object:
+        return True
+
+    initializer = nothing
+    if statement.initializer is not None:
+        initializer = compile_stmt(statement.initializer)
+    condition = forever
+    if statement.condition is not None:
+        condition = compile_expr(statement.condition)
+    increment = nothing
+    if statement.increment is not None:
+        increment = compile_expr(statement.increment)
+    body = compile_stmt(statement.body)
+    body_returns = returns(statement.body)
+    size = statement.size
+
+    def execute(environment: Frame) -> object:
+        if size > 0:
+            environment = Frame([None] * size, environment)
+        initializer(environment)
+        value = condition(environment)
+        while value is not None and value is not False:
+            completion = body(environment)
+            if body_returns and completion is not None:
+                return completion
+            increment(environment)
+            value = condition(environment)
+        return None
+
+    return execute
+
+
+def return_stmt(statement: stmt.Return) -> StmtFn:
+    if statement.value is None:
+
+        def execute_nil(environment: Frame) -> object:
+            return (None,)
+
+        return execute_nil
+
+    value = compile_expr(statement.value)
+
+    def execute(environment: Frame) -> object:
+        return (value(environment),)
+
+    return execute
+
+
+def function_stmt(statement: stmt.Function) -> StmtFn:
+    function = ClosureFunction(statement, compile_program(statement.body))
+
+    if statement.slot is None:
+        name = statement.name.lexeme
+        global_values = env.state.get().globals.values
+
+        def execute_global(environment: Frame) -> None:
+            global_values[name] = function
+
+        return execute_global
+
+    slot = statement.slot
+
+    def execute(environment: Frame) -> None:
+        environment.values[slot] = function
+
+    return execute
+
+
+# ------------------------- EXPRESSIONS -------------------------
+
+
+def compile_expr(expression: Expr) -> ExprFn:
+    match expression:
+        case expr.Literal():
+            return literal(expression.value)
+        case expr.Grouping():
+            return compile_expr(expression.expression)
+        case expr.Variable():
+            return variable(expression)
+        case expr.Assign():
+            return assign(expression)
+        case expr.Binary():
+            operator_type = expression.operator.type.value
+            right = expression.right
+            if isinstance(right, expr.Literal) and isinstance(right.value, float):
+                constant_maker = constant_makers.get(operator_type)
+                if constant_maker is not None:
+                    return constant_maker(
+                        compile_expr(expression.left), expression.operator, right.value
+                    )
+
+            maker = binary_makers[operator_type]
+            return maker(
+                compile_expr(expression.left),
+                expression.operator,
+                compile_expr(expression.right),
+            )
+        case expr.Unary():
+            if expression.operator.type is TT.BANG:
+                return not_expr(compile_expr(expression.right))
+            return negate(expression.operator, compile_expr(expression.right))
+        case expr.Logical():
+            if expression.operator.type is TT.OR:
+                return or_expr(
+                    compile_expr(expression.left), compile_expr(expression.right)
+                )
+            return and_expr(
+                compile_expr(expression.left), compile_expr(expression.right)
+            )
+        case expr.Call():
+            return call(expression)
+
+    raise ValueError("Unknown expression type '" + expression.__class__.__name__ + "'.")
+
+
+def literal(value: object) -> ExprFn:
+    def evaluate(environment: Frame) -> object:
+        return value
+
+    return evaluate
+
+
+def variable(expression: expr.Variable) -> ExprFn:
+    name = expression.name.lexeme
+
+    if expression.depth is None:
+        lox_token = expression.name
+        global_values = env.state.get().globals.values
+
+        def evaluate_global(environment: Frame) -> object:
+            try:
+                return global_values[name]
+            except KeyError:
+                error_str = "Undefined variable '" + name + "'."
+                raise error.runtime_error(lox_token, error_str)
+
+        return evaluate_global
+
+    slot = expression.slot
+    # The resolver gives every local a slot along with its depth.
+    assert slot is not None
+
+    if expression.depth == 0:
+
+        def evaluate_local(environment: Frame) -> object:
+            return environment.values[slot]
+
+        return evaluate_local
+
+    if expression.depth == 1:
+
+        def evaluate_enclosing(environment: Frame) -> object:
+            return environment.enclosing.values[slot]  # type: ignore
+
+        return evaluate_enclosing
+
+    depth = expression.depth
+
+    def evaluate(environment: Frame) -> object:
+        return environment.ancestor(depth).values[slot]
+
+    return evaluate
+
+
+def assign(expression: expr.Assign) -> ExprFn:
+    name = expression.name.lexeme
+    value_fn = compile_expr(expression.value)
+
+    if expression.depth is None:
+        lox_token = expression.name
+        global_values = env.state.get().globals.values
+
+        def evaluate_global(environment: Frame) -> object:
+            value = value_fn(environment)
+            if name not in global_values:
+                error_str = "Undefined variable '" + name + "'."
+                raise error.runtime_error(lox_token, error_str)
+            global_values[name] = value
+            return value
+
+        return evaluate_global
+
+    slot = expression.slot
+    assert slot is not None
+
+    if expression.depth == 0:
+
+        def evaluate_local(environment: Frame) -> object:
+            value = environment.values[slot] = value_fn(environment)
+            return value
+
+        return evaluate_local
+
+    depth = expression.depth
+
+    def evaluate(environment: Frame) -> object:
+        value = environment.ancestor(depth).values[slot] = value_fn(environment)
+        return value
+
+    return evaluate
+
+
+def call(expression: expr.Call) -> ExprFn:
+    callee_fn = compile_expr(expression.callee)
+    argument_fns = tuple(compile_expr(argument) for argument in expression.arguments)
+    paren = expression.paren
+
+    def evaluate(environment: Frame) -> object:
+        callee = callee_fn(environment)
+        args = [argument(environment) for argument in argument_fns]
+
+        if not isinstance(callee, LoxCallable):
+            raise error.runtime_error(paren, "Can only call functions and classes.")
+
+        if len(args) != callee.arity():
+            error_str = "Expected " + str(callee.arity()) + " arguments but got "
+            error_str = error_str + str(len(args)) + "."
+            raise error.runtime_error(paren, error_str)
+
+        try:
+            return callee.call(args)
+        except RecursionError:
+            raise error.StackOverflow(paren.line)
+        except error.NativeError as native:
+            raise error.runtime_error(paren, native.args[0])
+
+    return evaluate
+
+
+def not_expr(right: ExprFn) -> ExprFn:
+    def evaluate(environment: Frame) -> object:
+        value = right(environment)
+        return value is None or value is False
+
+    return evaluate
+
+
+def negate(operator: Token, right: ExprFn) -> ExprFn:
+    def evaluate(environment: Frame) -> object:
+        value = right(environment)
+        if isinstance(value, float):
+            return 0 - value
+        raise error.runtime_error(operator, "Operand must be a number.")
+
+    return evaluate
+
+
+def or_expr(left: ExprFn, right: ExprFn) -> ExprFn:
+    def evaluate(environment: Frame) -> object:
+        value = left(environment)
+        if value is not None and value is not False:
+            return value
+        return right(environment)
+
+    return evaluate
+
+
+def and_expr(left: ExprFn, right: ExprFn) -> ExprFn:
+    def evaluate(environment: Frame) -> object:
+        value = left(environment)
+        if value is None or value is False:
+            return value
+        return right(environment)
+
+    return evaluate
+
+
+# One maker per operator, so the operator is only looked at while compiling.
+
+
+def add(left: ExprFn, operator: Token, right: ExprFn) -> ExprFn:
+    def evaluate(environment: Frame) -> object:
+        a = left(environment)
+        b = right(environment)
+        if isinstance(a, float) and isinstance(b, float):
+            return a + b
+        if isinstance(a, STRINGS) and isinstance(b, STRINGS):
+            return concat(a, b)
+        error_str = "Operands must be two numbers or two strings."
+        raise error.runtime_error(operator, error_str)
+
+    return evaluate
+
+
+def subtract(left: ExprFn, operator: Token, right: ExprFn) -> ExprFn:
+    def evaluate(environment: Frame) -> object:
+        a = left(environment)
+        b = right(environment)
+        if isinstance(a, float) and isinstance(b, float):
+            return a - b
+        raise error.runtime_error(operator, "Operands must be a number.")
+
+    return evaluate
+
+
+def multiply(left: ExprFn, operator: Token, right: ExprFn) -> ExprFn:
+    def evaluate(environment: Frame) -> object:
+        a = left(environment)
+        b = right(environment)
+        if isinstance(a, float) and isinstance(b, float):
+            return a * b
+        raise error.runtime_error(operator, "Operands must be a number.")
+
+    return evaluate
+
+
+def divide(left: ExprFn, operator: Token, right: ExprFn) -> ExprFn:
+    def evaluate(environment: Frame) -> object:
+        a = left(environment)
+        b = right(environment)
+        if isinstance(a, float) and isinstance(b, float):
+            return a / b
+        raise error.runtime_error(operator, "Operands must be a number.")
+
+    return evaluate
+
+
+def greater(left: ExprFn, operator: Token, right: ExprFn) -> ExprFn:
+    def evaluate(environment: Frame) -> object:
+        a = left(environment)
+        b = right(environment)
+        if isinstance(a, float) and isinstance(b, float):
+            return a > b
+        raise error.runtime_error(operator, "Operands must be a number.")
+
+    return evaluate
+
+
+def greater_equal(left: ExprFn, operator: Token, right: ExprFn) -> ExprFn:
+    def evaluate(environment: Frame) -> object:
+        a = left(environment)
+        b = right(environment)
+        if isinstance(a, float) and isinstance(b, float):
+            return a >= b
+        raise error.runtime_error(operator, "Operands must be a number.")
+
+    return evaluate
+
+
+def less(left: ExprFn, operator: Token, right: ExprFn) -> ExprFn:
+    def evaluate(environment: Frame) -> object:
+        a = left(environment)
+        b = right(environment)
+        if isinstance(a, float) and isinstance(b, float):
+            return a < b
+        raise error.runtime_error(operator, "Operands must be a number.")
+
+    return evaluate
+
+
+def less_equal(left: ExprFn, operator: Token, right: ExprFn) -> ExprFn:
+    def evaluate(environment: Frame) -> object:
+        a = left(environment)
+        b = right(environment)
+        if isinstance(a, float) and isinstance(b, float):
+            return a <= b
+        raise error.runtime_error(operator, "Operands must be a number.")
+
+    return evaluate
+
+
+def equal(left: ExprFn, operator: Token, right: ExprFn) -> ExprFn:
+    is_equal = expr.is_equal
+
+    def evaluate(environment: Frame) -> object:
+        return is_equal(left(environment), right(environment))
+
+    return evaluate
+
+
+def not_equal(left: ExprFn, operator: Token, right: ExprFn) -> ExprFn:
+    is_equal = expr.is_equal
+
+    def evaluate(environment: Frame) -> object:
+        return not is_equal(left(environment), right(environment))
+
+    return evaluate
+
+
+binary_makers: dict[int, Callable[[ExprFn, Token, ExprFn], ExprFn]] = {
+    TT.PLUS.value: add,
+    TT.MINUS.value: subtract,
+    TT.STAR.value: multiply,
+    TT.SLASH.value: divide,
+    TT.GREATER.value: greater,
+    TT.GREATER_EQUAL.value: greater_equal,
+    TT.LESS.value: less,
+    TT.LESS_EQUAL.value: less_equal,
+    TT.EQUAL_EQUAL.value: equal,
+    TT.BANG_EQUAL.value: not_equal,
+}
+
+
+# Same operators with a number literal as right operand, the most common
+# shape in loop conditions and counters.
+
+
+def add_constant(left: ExprFn, operator: Token, constant: float) -> ExprFn:
+    def evaluate(environment: Frame) -> object:
+        a = left(environment)
+        if isinstance(a, float):
+            return a + constant
+        error_str = "Operands must be two numbers or two strings."
+        raise error.runtime_error(operator, error_str)
+
+    return evaluate
+
+
+def subtract_constant(left: ExprFn, operator: Token, constant: float) -> ExprFn:
+    def evaluate(environment: Frame) -> object:
+        a = left(environment)
+        if isinstance(a, float):
+            return a - constant
+        raise error.runtime_error(operator, "Operands must be a number.")
+
+    return evaluate
+
+
+def multiply_constant(left: ExprFn, operator: Token, constant: float) -> ExprFn:
+    def evaluate(environment: Frame) -> object:
+        a = left(environment)
+        if isinstance(a, float):
+            return a * constant
+        raise error.runtime_error(operator, "Operands must be a number.")
+
+    return evaluate
+
+
+def greater_constant(left: ExprFn, operator: Token, constant: float) -> ExprFn:
+    def evaluate(environment: Frame) -> object:
+        a = left(environment)
+        if isinstance(a, float):
+            return a > constant
+        raise error.runtime_error(operator, "Operands must be a number.")
+
+    return evaluate
+
+
+def greater_equal_constant(left: ExprFn, operator: Token, constant: float) -> ExprFn:
+    def evaluate(environment: Frame) -> object:
+        a = left(environment)
+        if isinstance(a, float):
+            return a >= constant
+        raise error.runtime_error(operator, "Operands must be a number.")
+
+    return evaluate
+
+
+def less_constant(left: ExprFn, operator: Token, constant: float) -> ExprFn:
+    def evaluate(environment: Frame) -> object:
+        a = left(environment)
+        if isinstance(a, float):
+            return a < constant
+        raise error.runtime_error(operator, "Operands must be a number.")
+
+    return evaluate
+
+
+def less_equal_constant(left: ExprFn, operator: Token, constant: float) -> ExprFn:
+    def evaluate(environment: Frame) -> object:
+        a = left(environment)
+        if isinstance(a, float):
+            return a <= constant
+        raise error.runtime_error(operator, "Operands must be a number.")
+
+    return evaluate
+
+
+constant_makers: dict[int, Callable[[ExprFn, Token, float], ExprFn]] = {
+    TT.PLUS.value: add_constant,
+    TT.MINUS.value: subtract_constant,
+    TT.STAR.value: multiply_constant,
+    TT.GREATER.value: greater_constant,
+    TT.GREATER_EQUAL.value: greater_equal_constant,
+    TT.LESS.value: less_constant,
+    TT.LESS_EQUAL.value: less_equal_constant,
+}
@@ -0,0 +1,284 @@
+import expr
+import stmt
+import op_code as OP
+import token_type_instances as TT
+from expr import Expr
+from stmt import Stmt
+from token_class import Token
+from vm import VMFunction
+
+
+class Local:
+    def __init__(self, name: str, depth: int) -> None:
+        self.name: str = name
+        self.depth: int = depth
+
+
+class Compiler:
+    """
+    Lowers a resolved AST to bytecode. Locals live in VM stack slots, so a
+    block only has to pop its declarations when it ends. Each function gets
+    its own Compiler since function bodies only see their own locals and
+    globals.
+    """
+
+    binary_ops: dict[int, int] = {
+        TT.MINUS.value: OP.SUBTRACT,
+        TT.SLASH.value: OP.DIVIDE,
+        TT.STAR.value: OP.MULTIPLY,
+        TT.PLUS.value: OP.ADD,
+        TT.GREATER.value: OP.GREATER,
+        TT.GREATER_EQUAL.value: OP.GREATER_EQUAL,
+        TT.LESS.value: OP.LESS,
+        TT.LESS_EQUAL.value: OP.LESS_EQUAL,
+        TT.BANG_EQUAL.value: OP.NOT_EQUAL,
+        TT.EQUAL_EQUAL.value: OP.EQUAL,
+    }
+
+    compare_jumps: dict[int, int] = {
+        TT.LESS.value: OP.JUMP_IF_NOT_LESS,
+        TT.LESS_EQUAL.value: OP.JUMP_IF_NOT_LESS_EQUAL,
+        TT.GREATER.value: OP.JUMP_IF_NOT_GREATER,
+        TT.GREATER_EQUAL.value: OP.JUMP_IF_NOT_GREATER_EQUAL,
+    }
+
+    def __init__(self, function: VMFunction) -> None:
+        self.function: VMFunction = function
+        self.locals: list[Local] = []
+        self.scope_depth: int = 0
+        self.line: int = 1
+
+    def compile(self, statements: list[Stmt]) -> VMFunction:
+        for statement in statements:
+            self.statement(statement)
+
+        self.emit(OP.NIL)
+        self.emit(OP.RETURN)
+        return self.function
+
+    # ------------------------- EMITTING -------------------------
+
+    def emit(self, byte: int) -> None:
+        self.function.chunk.write(byte, self.line)
+
+    def emit_op(self, op: int, operand: int) -> None:
+        self.emit(op)
+        self.emit(operand)
+
+    def emit_jump(self, op: int) -> int:
+        self.emit_op(op, -1)
+        return len(self.function.chunk.code) - 1
+
+    def patch_jump(self, operand: int) -> None:
+        self.function.chunk.code[operand] = len(self.function.chunk.code)
+
+    def emit_constant(self, value: object) -> None:
+        self.emit_op(OP.CONSTANT, self.function.chunk.add_constant(value))
+
+    def set_line(self, lox_token: Token) -> None:
+        self.line = lox_token.line
+
+    # ------------------------- VARIABLES -------------------------
+
+    def begin_scope(self) -> None:
+        self.scope_depth += 1
+
+    def end_scope(self) -> None:
+        self.scope_depth -= 1
+
+        count = 0
+        while len(self.locals) > 0 and self.locals[-1].depth > self.scope_depth:
+            self.locals.pop()
+            count += 1
+
+        if count == 1:
+            self.emit(OP.POP)
+        elif count > 1:
+            self.emit_op(OP.POPN, count)
+
+    def define_variable(self, name: Token) -> None:
+        # The value is already on top of the stack: at local scope that
+        # stack slot simply becomes the variable.
+        if self.scope_depth > 0:
+            self.locals.append(Local(name.lexeme, self.scope_depth))
+        else:
+            self.set_line(name)
+            index = self.function.chunk.add_name(name.lexeme)
+            self.emit_op(OP.DEFINE_GLOBAL, index)
+
+    def resolve_local(self, name: Token) -> int:
+        for slot in range(len(self.locals) - 1, -1, -1):
+            if self.locals[slot].name == name.lexeme:
+                return slot
+
+        return -1
+
+    def named_variable(
+        self, node: expr.Variable | expr.Assign, ops: tuple[int, int]
+    ) -> None:
+        # ops holds the (local, global) opcode pair to emit.
+        self.set_line(node.name)
+        slot = -1
+        if node.depth is not None:
+            slot = self.resolve_local(node.name)
+
+        if slot != -1:
+            self.emit_op(ops[0], slot)
+        else:
+            index = self.function.chunk.add_name(node.name.lexeme)
+            self.emit_op(ops[1], index)
+
+    def condition_jump(self, condition: Expr) -> int:
+        # Emits a jump taken when condition is falsey, fusing a comparison
+        # into the jump when possible.
+        while isinstance(condition, expr.Grouping):
+            condition = condition.expression
+
+        if isinstance(condition, expr.Binary):
+            jump_op = self.compare_jumps.get(condition.operator.type.value)
+            if jump_op is not None:
+                self.expression(condition.left)
+                self.expression(condition.right)
+                self.set_line(condition.operator)
+                return self.emit_jump(jump_op)
+
+        self.expression(condition)
+        return self.emit_jump(OP.POP_JUMP_IF_FALSE)
+
+    # ------------------------- STATEMENTS -------------------------
+
+    def statement(self, statement: Stmt) -> None:
+        match statement:
+            case stmt.ExpressionStmt():
+                if isinstance(statement.expression, expr.Assign):
+                    self.expression(statement.expression.value)
+                    self.named_variable(
+                        statement.expression, (OP.STORE_LOCAL, OP.STORE_GLOBAL)
+                    )
+                else:
+                    self.expression(statement.expression)
+                    self.emit(OP.POP)
+            case stmt.Print():
+                self.expression(statement.expression)
+                self.emit(OP.PRINT)
+            case stmt.Var():
+                self.set_line(statement.name)
+                if statement.initializer is not None:
+                    self.expression(statement.initializer)
+                else:
+                    self.emit(OP.NIL)
+                self.define_variable(statement.name)
+            case stmt.Block():
+                self.begin_scope()
+                for inner in statement.statements:
+                    self.statement(inner)
+                self.end_scope()
+            case stmt.For():
+                self.for_statement(statement)
+            case stmt.Return():
+                self.set_line(statement.keyword)
+                if statement.value is not None:
+                    self.expression(statement.value)
+                else:
+                    self.emit(OP.NIL)
+                self.emit(OP.RETURN)
+            case stmt.If():
+                else_jump = self.condition_jump(statement.condition)
+                self.statement(statement.then_branch)
+                if statement.else_branch is not None:
+                    end_jump = self.emit_jump(OP.JUMP)
+                    self.patch_jump(else_jump)
+                    self.statement(statement.else_branch)
+                    self.patch_jump(end_jump)
+                else:
+                    self.patch_jump(else_jump)
+            case stmt.While():
+                loop_start = len(self.function.chunk.code)
+                exit_jump = self.condition_jump(statement.condition)
+                self.statement(statement.body)
+                self.emit_op(OP.JUMP, loop_start)
+                self.patch_jump(exit_jump)
+            case stmt.Function():
+                self.function_declaration(statement)
+
+    def for_statement(self, statement: stmt.For) -> None:
+        self.begin_scope()
+        if statement.initializer is not None:
+            self.statement(statement.initializer)
+
+        loop_start = len(self.function.chunk.code)
+        exit_jump = -1
+        if statement.condition is not None:
+            exit_jump = self.condition_jump(statement.condition)
+        self.statement(statement.body)
+        if statement.increment is not None:
+            self.statement(stmt.ExpressionStmt(statement.increment))
+        self.emit_op(OP.JUMP, loop_start)
+        if exit_jump != -1:
+            self.patch_jump(exit_jump)
+        self.end_scope()
+
+    def function_declaration(self, declaration: stmt.Function) -> None:
+        function = VMFunction(declaration.name.lexeme, len(declaration.params))
+        compiler = Compiler(function)
+        compiler.line = declaration.name.line
+        compiler.begin_scope()
+        for param in declaration.params:
+            compiler.define_variable(param)
+        compiler.compile(declaration.body)
+
+        self.set_line(declaration.name)
+        self.emit_constant(function)
+        self.define_variable(declaration.name)
+
+    # ------------------------- EXPRESSIONS -------------------------
+
+    def expression(self, expression: Expr) -> None:
+        match expression:
+            case expr.Literal():
+                if expression.value is None:
+                    self.emit(OP.NIL)
+                elif expression.value is True:
+                    self.emit(OP.TRUE)
+                elif expression.value is False:
+                    self.emit(OP.FALSE)
+                else:
+                    self.emit_constant(expression.value)
+            case expr.Grouping():
+                self.expression(expression.expression)
+            case expr.Variable():
+                self.named_variable(expression, (OP.GET_LOCAL, OP.GET_GLOBAL))
+            case expr.Assign():
+                self.expression(expression.value)
+                self.named_variable(expression, (OP.SET_LOCAL, OP.SET_GLOBAL))
+            case expr.Binary():
+                self.expression(expression.left)
+                self.expression(expression.right)
+                self.set_line(expression.operator)
+                self.emit(self.binary_ops[expression.operator.type.value])
+            case expr.Unary():
+                self.expression(expression.right)
+                self.set_line(expression.operator)
+                if expression.operator.type is TT.BANG:
+                    self.emit(OP.NOT)
+                else:
+                    self.emit(OP.NEGATE)
+            case expr.Logical():
+                self.expression(expression.left)
+                if expression.operator.type is TT.OR:
+                    end_jump = self.emit_jump(OP.JUMP_IF_TRUE)
+                else:
+                    end_jump = self.emit_jump(OP.JUMP_IF_FALSE)
+                self.emit(OP.POP)
+                self.expression(expression.right)
+                self.patch_jump(end_jump)
+            case expr.Call():
+                self.expression(expression.callee)
+                for argument in expression.arguments:
+                    self.expression(argument)
+                self.set_line(expression.paren)
+                self.emit_op(OP.CALL, len(expression.arguments))
+
+
+def compile_program(statements: list[Stmt]) -> VMFunction:
+    return Compiler(VMFunction("script", 0)).compile(statements)
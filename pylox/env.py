@@ -1,4 +1,5 @@
 from __future__ import annotations
+from contextvars import ContextVar
 import error
 from token_class import Token
 
@@ -9,12 +10,11 @@ class Environment:
         self.enclosing: Environment | None = enclosing
 
     def define(self, name: str, value: object):
-        self.values.update({name: value})
+        self.values[name] = value
 
     def get(self, name: Token) -> object:
-        value = self.values.get(name.lexeme)
-        if value is not None:
-            return value
+        if name.lexeme in self.values:
+            return self.values[name.lexeme]
 
         if self.enclosing is not None:
             return self.enclosing.get(name)
@@ -25,7 +25,7 @@ class Environment:
     def assign(self, name: Token, value: object) -> None:
         # test_value = self.values.get(name.lexeme)
         if name.lexeme in self.values:
-            self.values.update({name.lexeme: value})
+            self.values[name.lexeme] = value
             return
 
         if self.enclosing is not None:
@@ -36,5 +36,47 @@ class Environment:
         raise error.runtime_error(name, error_str)
 
 
-globals = Environment()
-instance = globals
+class Frame:
+    """
+    Local scope of a block or function call. Variables are addressed by the
+    (depth, slot) pair computed by the resolver, so a frame is just a list
+    sized to the scope's declarations. Only globals are looked up by name.
+    """
+
+    __slots__ = ("values", "enclosing")
+
+    def __init__(self, values: list[object], enclosing: Frame | Environment) -> None:
+        self.values: list[object] = values
+        self.enclosing: Frame | Environment = enclosing
+
+    def ancestor(self, distance: int) -> Frame:
+        frame: Frame = self
+        for _ in range(distance):
+            frame = frame.enclosing  # type: ignore
+
+        return frame
+
+    def get_at(self, distance: int, slot: int) -> object:
+        return self.ancestor(distance).values[slot]
+
+    def assign_at(self, distance: int, slot: int, value: object) -> None:
+        self.ancestor(distance).values[slot] = value
+
+
+class State:
+    """
+    The globals a program runs in and the environment it is executing in.
+    The evaluators find it through the state context variable, so each
+    thread, and each asyncio task, can run a program of its own (see
+    interpreter.Interpreter). Without one set, everything shares the
+    default state, as lox.py does.
+    """
+
+    __slots__ = ("globals", "instance")
+
+    def __init__(self, globals: Environment) -> None:
+        self.globals: Environment = globals
+        self.instance: Environment | Frame = globals
+
+
+state: ContextVar[State] = ContextVar("state", default=State(Environment()))
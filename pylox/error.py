@@ -1,14 +1,43 @@
+from contextvars import ContextVar
 from token_class import Token
 import token_type_instances as TT
+import output
 
-had_error = False
-had_runtime_error = False
+
+class Flags:
+    # Whether the program being run had a compile or a runtime error. Like
+    # env.State, one per running program.
+    __slots__ = ("had_error", "had_runtime_error")
+
+    def __init__(self) -> None:
+        self.had_error: bool = False
+        self.had_runtime_error: bool = False
+
+
+flags: ContextVar[Flags] = ContextVar("flags", default=Flags())
+
+
+class StackOverflow(Exception):
+    """
+    Raised, with the line of the call, where Python ran out of recursion.
+    It is reported once the stack has unwound (see report_stack_overflow),
+    reporting right away could overflow again.
+    """
+
+
+class NativeError(Exception):
+    """
+    Raised by native functions with the message of a runtime error, the
+    call site reports it on its own line.
+    """
 
 
 def report(line: int, where: str, message: str) -> None:
-    print("[line " + str(line) + "] Error" + where + ": " + message)
-    global had_error
-    had_error = True
+    # Through the sink, after everything the program printed before.
+    sink = output.sink.get()
+    sink.write_line("[line " + str(line) + "] Error" + where + ": " + message)
+    sink.flush()
+    flags.get().had_error = True
 
 
 def line_error(line: int, message: str) -> None:
@@ -23,7 +52,26 @@ def token_error(lox_token: Token, message: str) -> None:
 
 
 def runtime_error(lox_token: Token, message: str) -> RuntimeError:
-    print(message + "\n[line " + str(lox_token.line) + "]")
-    global had_runtime_error
-    had_runtime_error = True
+    return line_runtime_error(lox_token.line, message)
+
+
+def line_runtime_error(line: int, message: str) -> RuntimeError:
+    sink = output.sink.get()
+    sink.write_line(message + "\n[line " + str(line) + "]")
+    sink.flush()
+    flags.get().had_runtime_error = True
     raise RuntimeError
+
+
+def report_stack_overflow(overflow: StackOverflow) -> RuntimeError:
+    return line_runtime_error(overflow.args[0], "Stack overflow.")
+
+
+def report_recursion() -> None:
+    # Python ran out of stack outside a Lox call, in deeply nested source or
+    # while printing a deeply nested value. No line is to blame, so the
+    # message goes without one.
+    sink = output.sink.get()
+    sink.write_line("Stack overflow.")
+    sink.flush()
+    flags.get().had_runtime_error = True
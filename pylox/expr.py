@@ -1,6 +1,7 @@
 from token_class import Token
 from lox_callable import LoxCallable
 import token_type_instances as TT
+from rope import STRINGS, concat
 import error
 import env
 
@@ -13,11 +14,17 @@ class Expr:
         raise NotImplementedError
 
 
+# Evaluations of a Binary node before it specializes itself on the operand
+# types it sees, see Binary.quicken.
+QUICKEN_AFTER = 2
+
+
 class Binary(Expr):
     def __init__(self, left: Expr, operator: Token, right: Expr) -> None:
         self.left = left
         self.operator = operator
         self.right = right
+        self.warmup: int = QUICKEN_AFTER
 
     def __str__(self) -> str:
         return parenthesize(self.operator.lexeme, [self.left, self.right])
@@ -26,6 +33,14 @@ class Binary(Expr):
         left: object = self.left.interpret()
         right: object = self.right.interpret()
 
+        if self.warmup > 0:
+            self.warmup -= 1
+            if self.warmup == 0:
+                self.quicken(left, right)
+
+        return self.operate(left, right)
+
+    def operate(self, left: object, right: object) -> object:
         match self.operator.type:
             case TT.MINUS:
                 left, right = check_operands(self.operator, left, right)
@@ -55,8 +70,8 @@ class Binary(Expr):
             case TT.PLUS:
                 if isinstance(left, float) and isinstance(right, float):
                     return float(left) + float(right)
-                elif isinstance(left, str) and isinstance(right, str):
-                    return str(left) + str(right)
+                elif isinstance(left, STRINGS) and isinstance(right, STRINGS):
+                    return concat(left, right)  # type: ignore
                 else:
                     raise error.runtime_error(
                         self.operator, "Operands must be two numbers or two strings."
@@ -64,6 +79,139 @@ class Binary(Expr):
 
         return None
 
+    def quicken(self, left: object, right: object) -> None:
+        # Turns the node into a subclass that only handles these operand
+        # types. Its guard sends anything else back through generalize().
+        specialized: type | None = None
+        if left.__class__ is float and right.__class__ is float:
+            specialized = number_binaries.get(self.operator.type.value)
+        elif isinstance(left, STRINGS) and isinstance(right, STRINGS):
+            if self.operator.type is TT.PLUS:
+                specialized = StringAdd
+
+        if specialized is not None:
+            self.__class__ = specialized
+
+    def generalize(self, left: object, right: object) -> object:
+        # The guard failed, the node stays generic from now on. Swapping
+        # between Binary and its subclasses is safe, they share one layout.
+        self.__class__ = Binary  # pyright: ignore[reportAttributeAccessIssue]
+        return self.operate(left, right)
+
+
+class NumberAdd(Binary):
+    def interpret(self) -> object:
+        left = self.left.interpret()
+        right = self.right.interpret()
+        if left.__class__ is float and right.__class__ is float:
+            return left + right  # type: ignore
+        return self.generalize(left, right)
+
+
+class NumberSubtract(Binary):
+    def interpret(self) -> object:
+        left = self.left.interpret()
+        right = self.right.interpret()
+        if left.__class__ is float and right.__class__ is float:
+            return left - right  # type: ignore
+        return self.generalize(left, right)
+
+
+class NumberMultiply(Binary):
+    def interpret(self) -> object:
+        left = self.left.interpret()
+        right = self.right.interpret()
+        if left.__class__ is float and right.__class__ is float:
+            return left * right  # type: ignore
+        return self.generalize(left, right)
+
+
+class NumberDivide(Binary):
+    def interpret(self) -> object:
+        left = self.left.interpret()
+        right = self.right.interpret()
+        if left.__class__ is float and right.__class__ is float:
+            return left / right  # type: ignore
+        return self.generalize(left, right)
+
+
+class NumberGreater(Binary):
+    def interpret(self) -> object:
+        left = self.left.interpret()
+        right = self.right.interpret()
+        if left.__class__ is float and right.__class__ is float:
+            return left > right  # type: ignore
+        return self.generalize(left, right)
+
+
+class NumberGreaterEqual(Binary):
+    def interpret(self) -> object:
+        left = self.left.interpret()
+        right = self.right.interpret()
+        if left.__class__ is float and right.__class__ is float:
+            return left >= right  # type: ignore
+        return self.generalize(left, right)
+
+
+class NumberLess(Binary):
+    def interpret(self) -> object:
+        left = self.left.interpret()
+        right = self.right.interpret()
+        if left.__class__ is float and right.__class__ is float:
+            return left < right  # type: ignore
+        return self.generalize(left, right)
+
+
+class NumberLessEqual(Binary):
+    def interpret(self) -> object:
+        left = self.left.interpret()
+        right = self.right.interpret()
+        if left.__class__ is float and right.__class__ is float:
+            return left <= right  # type: ignore
+        return self.generalize(left, right)
+
+
+class NumberEqual(Binary):
+    def interpret(self) -> object:
+        left = self.left.interpret()
+        right = self.right.interpret()
+        if left.__class__ is float and right.__class__ is float:
+            return left == right
+        return self.generalize(left, right)
+
+
+class NumberNotEqual(Binary):
+    def interpret(self) -> object:
+        left = self.left.interpret()
+        right = self.right.interpret()
+        if left.__class__ is float and right.__class__ is float:
+            return left != right
+        return self.generalize(left, right)
+
+
+class StringAdd(Binary):
+    def interpret(self) -> object:
+        left = self.left.interpret()
+        right = self.right.interpret()
+        # Long strings are ropes, a loop building one stays on this path.
+        if isinstance(left, STRINGS) and isinstance(right, STRINGS):
+            return concat(left, right)  # type: ignore
+        return self.generalize(left, right)
+
+
+number_binaries: dict[int, type] = {
+    TT.PLUS.value: NumberAdd,
+    TT.MINUS.value: NumberSubtract,
+    TT.STAR.value: NumberMultiply,
+    TT.SLASH.value: NumberDivide,
+    TT.GREATER.value: NumberGreater,
+    TT.GREATER_EQUAL.value: NumberGreaterEqual,
+    TT.LESS.value: NumberLess,
+    TT.LESS_EQUAL.value: NumberLessEqual,
+    TT.EQUAL_EQUAL.value: NumberEqual,
+    TT.BANG_EQUAL.value: NumberNotEqual,
+}
+
 
 class Unary(Expr):
     def __init__(self, operator: Token, right: Expr) -> None:
@@ -114,25 +262,44 @@ class Literal(Expr):
 class Variable(Expr):
     def __init__(self, name: Token) -> None:
         self.name: Token = name
+        # Lexical address filled in by the resolver, None for globals.
+        self.depth: int | None = None
+        self.slot: int | None = None
 
     def __str__(self) -> str:
         return self.name.lexeme
 
     def interpret(self) -> object:
-        return env.instance.get(self.name)
+        if self.depth is None:
+            globals = env.state.get().globals
+            try:
+                return globals.values[self.name.lexeme]
+            except KeyError:
+                # Reports the undefined variable.
+                return globals.get(self.name)
+
+        if self.depth == 0:
+            return env.state.get().instance.values[self.slot]  # type: ignore
+
+        return env.state.get().instance.get_at(self.depth, self.slot)  # type: ignore
 
 
 class Assign(Expr):
     def __init__(self, name: Token, value: Expr) -> None:
         self.name: Token = name
         self.value: Expr = value
+        self.depth: int | None = None
+        self.slot: int | None = None
 
     def __str__(self) -> str:
         return self.name.lexeme
 
     def interpret(self) -> object:
         value: object = self.value.interpret()
-        env.instance.assign(self.name, value)
+        if self.depth is None:
+            env.state.get().globals.assign(self.name, value)
+        else:
+            env.state.get().instance.assign_at(self.depth, self.slot, value)  # type: ignore
         return value
 
 
@@ -163,6 +330,10 @@ class Call(Expr):
         self.callee: Expr = callee
         self.paren: Token = paren
         self.arguments: list[Expr] = args
+        # Inline cache: the last callee that passed the checks below. The
+        # argument count of a call site never changes, so they hold for as
+        # long as it is called again.
+        self.checked_callee: object = None
 
     def interpret(self) -> object:
         callee: object = self.callee.interpret()
@@ -171,20 +342,25 @@ class Call(Expr):
         for argument in self.arguments:
             args.append(argument.interpret())
 
-        if not isinstance(callee, LoxCallable):
-            raise error.runtime_error(
-                self.paren, "Can only call functions and classes."
-            )
-
-        # Implicit cast from Python? (object -> LoxCallable)
-        function: LoxCallable = callee
-
-        if len(args) != function.arity():
-            error_str = "Expected " + str(function.arity()) + " arguments but got "
-            error_str = error_str + str(len(args)) + "."
-            raise error.runtime_error(self.paren, error_str)
-
-        return function.call(args)
+        if callee is not self.checked_callee:
+            if not isinstance(callee, LoxCallable):
+                raise error.runtime_error(
+                    self.paren, "Can only call functions and classes."
+                )
+
+            if len(args) != callee.arity():
+                error_str = "Expected " + str(callee.arity()) + " arguments but got "
+                error_str = error_str + str(len(args)) + "."
+                raise error.runtime_error(self.paren, error_str)
+
+            self.checked_callee = callee
+
+        try:
+            return callee.call(args)  # type: ignore
+        except RecursionError:
+            raise error.StackOverflow(self.paren.line)
+        except error.NativeError as native:
+            raise error.runtime_error(self.paren, native.args[0])
 
 
 def parenthesize(name: str, exprs: list[Expr]) -> str:
@@ -0,0 +1,207 @@
+import asyncio
+import io
+import threading
+from typing import Generator, TextIO
+import env
+import error
+import lox
+import lox_callable
+import output
+from compiler import compile_program
+from lox_callable import LoxCallable
+from rope import flatten
+from vm import VM, SUSPENDED
+
+"""
+Interpreter objects for embedding Lox in a Python program. Each one owns
+its globals, current environment, error flags and print sink, so several
+programs can live side by side and be used from any thread:
+
+    interpreter = Interpreter()
+    interpreter.run("fun twice(n) { return 2 * n; }")
+    interpreter.call("twice", [21])  # 42.0
+
+The evaluators find that state through the context variables of the env,
+error and output modules, which an interpreter sets to its own while it
+runs. Different interpreters run at the same time in different threads,
+taking turns on the GIL. An interpreter runs one thing at a time, a second
+thread using it waits for the first.
+
+steps() and run_async() run a program in slices instead, so that long
+programs share the thread, or an event loop, with others.
+"""
+
+
+class Interpreter:
+    def __init__(self, backend: str = "tree", stream: TextIO | None = None) -> None:
+        if backend not in lox.backends:
+            raise ValueError("Unknown backend '" + backend + "'.")
+
+        self.backend: str = backend
+        # Program output and error messages, kept in memory unless a stream
+        # is given.
+        self.stream: TextIO = io.StringIO() if stream is None else stream
+        self.sink: output.OutputSink = output.OutputSink(self.stream, "size")
+        self.globals: env.Environment = env.Environment()
+        lox_callable.define_natives(self.globals)
+        self.state: env.State = env.State(self.globals)
+        self.flags: error.Flags = error.Flags()
+        self.lock: threading.RLock = threading.RLock()
+
+    def install(self) -> tuple:
+        # Makes this interpreter's state the current one, returns what
+        # uninstall() needs to put the previous one back.
+        return (
+            env.state.set(self.state),
+            error.flags.set(self.flags),
+            output.sink.set(self.sink),
+        )
+
+    def uninstall(self, tokens: tuple) -> None:
+        self.sink.flush()
+        env.state.reset(tokens[0])
+        error.flags.reset(tokens[1])
+        output.sink.reset(tokens[2])
+
+    def run(self, source: str) -> int:
+        """
+        Runs a program in this interpreter's globals. Returns what lox.py
+        would exit with: 0, 65 after a compile error, 70 after a runtime
+        error.
+        """
+        with self.lock:
+            tokens = self.install()
+            try:
+                self.flags.had_error = False
+                self.flags.had_runtime_error = False
+                lox.run(source, self.backend)
+            except RecursionError:
+                error.report_recursion()
+            except RuntimeError:
+                pass
+            finally:
+                self.uninstall(tokens)
+
+        return self.status()
+
+    def status(self) -> int:
+        if self.flags.had_error:
+            return 65
+        if self.flags.had_runtime_error:
+            return 70
+        return 0
+
+    def compile(self, source: str) -> VM | None:
+        """
+        Compiles a program for steps() and run_async(), on the VM, which
+        keeps its Lox frames to itself and can stop between any two
+        instructions, whatever the backend. Returns None after a compile
+        error.
+        """
+        with self.lock:
+            tokens = self.install()
+            try:
+                self.flags.had_error = False
+                self.flags.had_runtime_error = False
+                statements = lox.parse(lox.scanner_class(source).scan_tokens())
+                if self.flags.had_error:
+                    return None
+                vm = VM()
+                vm.enter(compile_program(statements), [])
+                return vm
+            except RecursionError:
+                error.report_recursion()
+                return None
+            finally:
+                self.uninstall(tokens)
+
+    def run_slice(self, vm: VM, fuel: int) -> object:
+        # Runs fuel jumps and calls of the program (see VM.run), the caller
+        # holds the lock. Returns SUSPENDED if the program isn't done.
+        tokens = self.install()
+        try:
+            return vm.run(fuel)
+        except RuntimeError:
+            return None
+        finally:
+            self.uninstall(tokens)
+
+    def steps(self, source: str, fuel: int = 1000) -> Generator[None, None, int]:
+        """
+        Runs a program like run(), yielding after it is compiled and after
+        every slice of it. Between slices the interpreter is free, other
+        threads can call into it.
+        """
+        vm = self.compile(source)
+        result: object = SUSPENDED
+        while vm is not None and result is SUSPENDED:
+            yield
+            with self.lock:
+                result = self.run_slice(vm, fuel)
+
+        return self.status()
+
+    async def run_async(self, source: str, fuel: int = 1000) -> int:
+        """
+        Runs a program a slice at a time, handing control back to the event
+        loop after each one. Returns the same status as run(). Compiling
+        runs in a worker thread, and while another thread is using the
+        interpreter the loop keeps running other tasks instead of waiting.
+        """
+        vm = await asyncio.to_thread(self.compile, source)
+        result: object = SUSPENDED
+        while vm is not None and result is SUSPENDED:
+            await asyncio.sleep(0)
+            while not self.lock.acquire(blocking=False):
+                await asyncio.sleep(0.001)
+            try:
+                result = self.run_slice(vm, fuel)
+            finally:
+                self.lock.release()
+
+        return self.status()
+
+    def call(self, function: str | LoxCallable, arguments: list[object]) -> object:
+        """
+        Calls a Lox function, given by value or by the name of a global, and
+        returns its result. A runtime error is reported to the sink and
+        raises RuntimeError, like in run().
+        """
+        with self.lock:
+            tokens = self.install()
+            try:
+                self.flags.had_runtime_error = False
+                return flatten(self.call_installed(function, arguments))
+            except error.StackOverflow as overflow:
+                raise error.report_stack_overflow(overflow)
+            finally:
+                self.uninstall(tokens)
+
+    def call_installed(
+        self, function: str | LoxCallable, arguments: list[object]
+    ) -> object:
+        if isinstance(function, str):
+            function = self.globals.values.get(function)  # type: ignore
+        if not isinstance(function, LoxCallable):
+            raise TypeError("Can only call functions and classes.")
+        if len(arguments) != function.arity():
+            raise TypeError(
+                "Expected "
+                + str(function.arity())
+                + " arguments but got "
+                + str(len(arguments))
+                + "."
+            )
+
+        # Lox numbers are floats, Python ints are taken as numbers too.
+        values = [to_lox(argument) for argument in arguments]
+        try:
+            return function.call(values)
+        except error.NativeError as native:
+            raise TypeError(native.args[0])
+
+
+def to_lox(value: object) -> object:
+    if isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    return value
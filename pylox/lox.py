@@ -1,57 +1,268 @@
+import mmap
 import sys
+from typing import IO, Iterable
 from stmt import Stmt
 import error
 from scanner import Scanner
-from parser_class import Parser
-from token_class import Token
+from regex_scanner import RegexScanner, StreamScanner, MappedScanner
+from parser_class import Parser, StreamingParser
+from resolver import Resolver
+from optimizer import optimize
+from profiler import NodeProfiler
+from sampler import StackSampler
+from token_class import TokenStream, TokenBuffer
+from compiler import compile_program
+from vm import VM
+import vm
+import closure_compiler
+import ast_cache
+import transpiler
+import env
+import output
 
+backends: list[str] = ["tree", "vm", "closure", "python"]
 
-def run_file(script: str) -> None:
-    file_handler = open(script, "r")
-    source_code = file_handler.read(-1)
-    file_handler.close()
+# Where the python backend writes the module it generates, if anywhere.
+dump_path: str | None = None
+
+# Scanner or RegexScanner, both produce the same TokenStream.
+scanner_class: type = Scanner
+
+# Run scripts one top-level declaration at a time (see run_stream).
+streaming: bool = False
+
+# Scan scripts straight from a memory-mapped file (see run_mapped).
+mapped: bool = False
+
+# Reuse cached resolved trees for unchanged scripts, see ast_cache.py.
+caching: bool = True
+
+# Set by --profile, reports where the tree-walker spent its time.
+profiler: NodeProfiler | None = None
+
+# Set by --sample=FILE, writes sampled Lox call stacks to sample_path.
+sampler: StackSampler | None = None
+sample_path: str = ""
+
+
+def run_file(script: str, backend: str = "tree") -> None:
+    file_handler = open(script, "rb" if mapped else "r")
+    if profiler is not None:
+        profiler.start()
+    if sampler is not None:
+        sampler.start()
     try:
-        run(source_code)
+        if mapped:
+            run_mapped(file_handler, backend)
+        elif streaming:
+            run_stream(file_handler, backend)
+        elif caching:
+            run_cached(script, file_handler.read(-1), backend)
+        else:
+            run(file_handler.read(-1), backend)
+    except RecursionError:
+        error.report_recursion()
     except RuntimeError:
         pass
+    file_handler.close()
+
+    if sampler is not None:
+        sampler.stop()
+        sampler.write(sample_path)
 
-    if error.had_error is True:
+    if profiler is not None:
+        profiler.stop()
+        output.flush()
+        profiler.report(sys.stderr)
+
+    if error.flags.get().had_error is True:
         sys.exit(65)
 
-    if error.had_runtime_error is True:
+    if error.flags.get().had_runtime_error is True:
         sys.exit(70)
 
 
-def run_prompt() -> None:
+def run_prompt(backend: str = "tree") -> None:
     while True:
         try:
+            output.flush()
             user_input = input("> ")
-            run(user_input)
-            error.had_error = False
+            run(user_input, backend)
+            error.flags.get().had_error = False
+        except RecursionError:
+            error.report_recursion()
         except RuntimeError:
             continue
         except EOFError:
             break
 
 
-def run(code: str) -> None:
-    scanner = Scanner(code)
-    tokens: list[Token] = scanner.scan_tokens()
+def run(code: str, backend: str = "tree") -> None:
+    scanner = scanner_class(code)
+    run_tokens(scanner.scan_tokens(), backend)
+
+
+def run_mapped(file_handler: IO[bytes], backend: str = "tree") -> None:
+    # The source stays in the page cache instead of being read and decoded
+    # into a str; only the lexemes of tokens the parser keeps are decoded.
+    try:
+        source = mmap.mmap(file_handler.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+        # Empty files can't be mapped.
+        run_tokens(MappedScanner(b"").scan_tokens(), backend)
+        return
+
+    try:
+        run_tokens(MappedScanner(source).scan_tokens(), backend)
+    finally:
+        source.close()
+
+
+def run_cached(script: str, code: str, backend: str = "tree") -> None:
+    key = ast_cache.source_key(code)
+    statements = ast_cache.load(script, key)
+    if statements is None:
+        statements = parse(scanner_class(code).scan_tokens())
+        if error.flags.get().had_error is True:
+            return
+        ast_cache.store(script, key, statements)
+
+    execute(statements, backend)
+
+
+def run_tokens(tokens: TokenStream, backend: str = "tree") -> None:
+    statements = parse(tokens)
+    if error.flags.get().had_error is True:
+        return
+
+    execute(statements, backend)
+
+
+def parse(tokens: TokenStream) -> list[Stmt]:
     parser = Parser(tokens)
     statements: list[Stmt] = parser.parse()
 
-    for statement in statements:
-        statement.interpret()
+    resolver = Resolver()
+    resolver.resolve(statements)
+    return optimize(statements)
+
+
+def run_stream(lines: Iterable[str], backend: str = "tree") -> None:
+    """
+    Scans, parses and runs the source incrementally: each top-level
+    declaration is executed as soon as it has been parsed, so only the
+    tokens and tree of one declaration are held at a time. Statements before
+    a syntax error have already run when it is found; nothing runs after it,
+    but the rest of the source is still parsed to report further errors.
+    """
+    tokens = TokenBuffer(StreamScanner(lines).scan_tokens())
+    parser = StreamingParser(tokens)
+    resolver = Resolver()
+
+    if backend == "python" and dump_path is not None:
+        # Each declaration is appended to the dump as its own module body.
+        open(dump_path, "w").close()
+
+    for statement in parser.declarations():
+        if statement is None:
+            continue
+
+        resolver.resolve([statement])
+        if error.flags.get().had_error is False:
+            execute(optimize([statement]), backend, "a")
+
+
+def execute(statements: list[Stmt], backend: str, dump_mode: str = "w") -> None:
+    if backend == "vm":
+        VM().interpret(compile_program(statements))
+        return
+
+    if backend == "python":
+        execute_transpiled(statements, dump_mode)
+        return
+
+    # A Lox call nests several Python calls in these two backends, deep
+    # recursion ends in Python's recursion limit.
+    try:
+        if backend == "closure":
+            # Top-level code declares no locals, its frame has no slots.
+            frame = env.Frame([], env.state.get().globals)
+            for compiled in closure_compiler.compile_program(statements):
+                compiled(frame)
+        else:
+            for statement in statements:
+                statement.interpret()
+    except error.StackOverflow as overflow:
+        raise error.report_stack_overflow(overflow)
+
+
+def execute_transpiled(statements: list[Stmt], dump_mode: str) -> None:
+    source = transpiler.transpile(statements)
+    if dump_path is not None:
+        dump_file = open(dump_path, dump_mode)
+        dump_file.write(source)
+        dump_file.close()
+    transpiler.execute(source)
+
+
+def usage() -> None:
+    options = "[--" + "|--".join(backends[1:]) + "] [--dump-py=FILE]"
+    options += " [--regex-scanner] [--stream] [--mmap]"
+    options += " [--no-cache] [--flush=" + "|".join(output.policies) + "]"
+    options += " [--profile] [--sample=FILE] [--stack-budget=MB]"
+    print("Usage: python lox.py " + options + " [script]")
+    sys.exit(64)
 
 
 if __name__ == "__main__":
-    if len(sys.argv) > 2:
-        print("Usage: python lox.py [script]")
-        sys.exit(64)
+    options = [arg for arg in sys.argv[1:] if arg.startswith("--")]
+    paths = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+
+    # Like Python's own stdout: line buffered on a terminal, blocks otherwise.
+    output.sink.get().set_policy("line" if sys.stdout.isatty() else "size")
+
+    backend = "tree"
+    for option in options:
+        if option[2:] in backends:
+            backend = option[2:]
+        elif option.startswith("--dump-py="):
+            dump_path = option[len("--dump-py=") :]
+        elif option == "--regex-scanner":
+            scanner_class = RegexScanner
+        elif option == "--stream":
+            streaming = True
+        elif option == "--mmap":
+            mapped = True
+        elif option == "--no-cache":
+            caching = False
+        elif option == "--profile":
+            profiler = NodeProfiler()
+        elif option.startswith("--sample="):
+            sampler = StackSampler()
+            sample_path = option[len("--sample=") :]
+        elif option.startswith("--stack-budget="):
+            megabytes = option[len("--stack-budget=") :]
+            if not megabytes.isdigit():
+                usage()
+            vm.stack_budget = int(megabytes) * 1024 * 1024
+        elif option.startswith("--flush="):
+            policy = option[len("--flush=") :]
+            if policy not in output.policies:
+                usage()
+            output.sink.get().set_policy(policy)
+        else:
+            usage()
+
+    # Only the tree-walker evaluates nodes through interpret(), and only it
+    # and the VM have a Lox call stack to sample.
+    if len(paths) > 1 or (profiler is not None and backend != "tree"):
+        usage()
+    if sampler is not None and backend not in ("tree", "vm"):
+        usage()
     else:
         # run_file("./examples/fun_call.lox")
         # quit()
-        if len(sys.argv) == 2:
-            run_file(sys.argv[1])
+        if len(paths) == 1:
+            run_file(paths[0], backend)
         else:
-            run_prompt()
+            run_prompt(backend)
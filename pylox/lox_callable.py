@@ -28,4 +28,13 @@ class Clock(LoxCallable):
         return "<native fn>"
 
 
-env.globals.define("clock", Clock())
+def define_natives(environment: env.Environment) -> None:
+    # natives builds on LoxCallable, so it can only be imported from here.
+    import natives
+
+    environment.define("clock", Clock())
+    for native in natives.natives():
+        environment.define(native.name, native)
+
+
+define_natives(env.state.get().globals)
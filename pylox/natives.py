@@ -0,0 +1,188 @@
+import math
+import reprlib
+from typing import Callable
+from lox_callable import LoxCallable
+from rope import Rope, flatten
+import error
+import expr
+
+"""
+Native standard library: string, number and math functions implemented in
+Python, so that common operations don't run node by node. Lox has no
+sequence type, split() and join() work on a small native list, built with
+list() and push() and read with get() and len().
+
+Every native checks its arguments before running. A bad argument raises
+error.NativeError, which the call site reports as a runtime error on its
+own line.
+"""
+
+
+class LoxList:
+    def __init__(self, items: list[object]) -> None:
+        self.items: list[object] = items
+
+    # A list that contains itself prints as [...] inside itself.
+    @reprlib.recursive_repr("[...]")
+    def __str__(self) -> str:
+        return "[" + ", ".join(expr.stringify(item) for item in self.items) + "]"
+
+
+# What each parameter accepts, and the name used in error messages.
+NUMBER = (float,)
+STRING = (str,)
+LIST = (LoxList,)
+SIZED = (str, LoxList)
+ANY = (object,)
+TYPE_NAMES = {NUMBER: "a number", STRING: "a string", LIST: "a list"}
+TYPE_NAMES[SIZED] = "a string or a list"
+
+
+class NativeFunction(LoxCallable):
+    def __init__(
+        self, name: str, params: list[tuple[type, ...]], function: Callable
+    ) -> None:
+        self.name: str = name
+        self.params: list[tuple[type, ...]] = params
+        self.function: Callable = function
+
+    def call(self, arguments: list[object]) -> object:
+        for position, (argument, accepted) in enumerate(zip(arguments, self.params)):
+            if argument.__class__ is Rope:
+                argument = arguments[position] = str(argument)
+            # Lox booleans aren't numbers, even though Python's are.
+            if not isinstance(argument, accepted) or (
+                isinstance(argument, bool) and accepted is not ANY
+            ):
+                raise error.NativeError(
+                    "Argument "
+                    + str(position + 1)
+                    + " of "
+                    + self.name
+                    + "() must be "
+                    + TYPE_NAMES[accepted]
+                    + "."
+                )
+
+        try:
+            return self.function(*arguments)
+        except (ValueError, OverflowError):
+            raise error.NativeError("Invalid argument to " + self.name + "().")
+
+    def arity(self) -> int:
+        return len(self.params)
+
+    def __str__(self) -> str:
+        return "<native fn>"
+
+
+def index(number: float, size: int, name: str) -> int:
+    # Positions are whole numbers from 0 to size (an end is one past).
+    if not number.is_integer() or number < 0 or number > size:
+        raise error.NativeError("Index out of range in " + name + "().")
+    return int(number)
+
+
+# ------------------------- STRINGS -------------------------
+
+
+def length(value: str | LoxList) -> float:
+    if isinstance(value, LoxList):
+        return float(len(value.items))
+    return float(len(value))
+
+
+def substring(text: str, start: float, end: float) -> str:
+    first = index(start, len(text), "substring")
+    last = index(end, len(text), "substring")
+    if last < first:
+        raise error.NativeError("Index out of range in substring().")
+    return text[first:last]
+
+
+def find(text: str, part: str) -> float:
+    return float(text.find(part))
+
+
+def split(text: str, separator: str) -> LoxList:
+    if separator == "":
+        return LoxList(list(text))
+    return LoxList(list(text.split(separator)))
+
+
+def join(parts: LoxList, separator: str) -> str:
+    items = [flatten(part) for part in parts.items]
+    for part in items:
+        if not isinstance(part, str):
+            raise error.NativeError("join() can only join strings.")
+    return separator.join(items)  # type: ignore
+
+
+# ------------------------- LISTS -------------------------
+
+
+def new_list() -> LoxList:
+    return LoxList([])
+
+
+def push(values: LoxList, value: object) -> LoxList:
+    values.items.append(value)
+    return values
+
+
+def get(values: LoxList, position: float) -> object:
+    if len(values.items) == 0:
+        raise error.NativeError("Index out of range in get().")
+    return values.items[index(position, len(values.items) - 1, "get")]
+
+
+# ------------------------- NUMBERS -------------------------
+
+
+def to_string(value: object) -> str:
+    return expr.stringify(value)
+
+
+def parse_number(text: str) -> float | None:
+    # Only what the scanner accepts as a number literal, else nil.
+    stripped = text.strip()
+    digits = stripped[1:] if stripped.startswith("-") else stripped
+    whole, dot, fraction = digits.partition(".")
+    if not whole.isdigit() or (dot != "" and not fraction.isdigit()):
+        return None
+    return float(stripped)
+
+
+def fixed(number: float, decimals: float) -> str:
+    places = index(decimals, 20, "fixed")
+    return format(number, "." + str(places) + "f")
+
+
+def natives() -> list[NativeFunction]:
+    return [
+        NativeFunction("len", [SIZED], length),
+        NativeFunction("substring", [STRING, NUMBER, NUMBER], substring),
+        NativeFunction("find", [STRING, STRING], find),
+        NativeFunction("split", [STRING, STRING], split),
+        NativeFunction("join", [LIST, STRING], join),
+        NativeFunction("upper", [STRING], str.upper),
+        NativeFunction("lower", [STRING], str.lower),
+        NativeFunction("list", [], new_list),
+        NativeFunction("push", [LIST, ANY], push),
+        NativeFunction("get", [LIST, NUMBER], get),
+        NativeFunction("str", [ANY], to_string),
+        NativeFunction("number", [STRING], parse_number),
+        NativeFunction("fixed", [NUMBER, NUMBER], fixed),
+        NativeFunction("abs", [NUMBER], abs),
+        NativeFunction("floor", [NUMBER], lambda x: float(math.floor(x))),
+        NativeFunction("ceil", [NUMBER], lambda x: float(math.ceil(x))),
+        NativeFunction("round", [NUMBER], lambda x: float(round(x))),
+        NativeFunction("sqrt", [NUMBER], math.sqrt),
+        NativeFunction("pow", [NUMBER, NUMBER], math.pow),
+        NativeFunction("exp", [NUMBER], math.exp),
+        NativeFunction("log", [NUMBER], math.log),
+        NativeFunction("sin", [NUMBER], math.sin),
+        NativeFunction("cos", [NUMBER], math.cos),
+        NativeFunction("min", [NUMBER, NUMBER], min),
+        NativeFunction("max", [NUMBER, NUMBER], max),
+    ]
@@ -0,0 +1,43 @@
+"""
+Instruction set of the bytecode backend. Operands are stored inline in
+Chunk.code right after their opcode; jump operands are absolute offsets.
+"""
+
+CONSTANT = 0  # [index]        push constants[index]
+NIL = 1
+TRUE = 2
+FALSE = 3
+POP = 4
+POPN = 5  # [count]
+GET_LOCAL = 6  # [slot]
+SET_LOCAL = 7  # [slot]
+GET_GLOBAL = 8  # [name index]
+SET_GLOBAL = 9  # [name index]
+DEFINE_GLOBAL = 10  # [name index]
+EQUAL = 11
+NOT_EQUAL = 12
+GREATER = 13
+GREATER_EQUAL = 14
+LESS = 15
+LESS_EQUAL = 16
+ADD = 17
+SUBTRACT = 18
+MULTIPLY = 19
+DIVIDE = 20
+NOT = 21
+NEGATE = 22
+PRINT = 23
+JUMP = 24  # [target]
+JUMP_IF_FALSE = 25  # [target]     leaves the condition on the stack
+JUMP_IF_TRUE = 26  # [target]      leaves the condition on the stack
+POP_JUMP_IF_FALSE = 27  # [target]
+CALL = 28  # [argument count]
+RETURN = 29
+
+# Superinstructions emitted by the compiler's peephole rules.
+STORE_LOCAL = 30  # [slot]             SET_LOCAL + POP
+STORE_GLOBAL = 31  # [name index]      SET_GLOBAL + POP
+JUMP_IF_NOT_LESS = 32  # [target]      LESS + POP_JUMP_IF_FALSE
+JUMP_IF_NOT_LESS_EQUAL = 33  # [target]
+JUMP_IF_NOT_GREATER = 34  # [target]
+JUMP_IF_NOT_GREATER_EQUAL = 35  # [target]
@@ -0,0 +1,161 @@
+import expr
+import stmt
+import token_type_instances as TT
+from expr import Expr
+from stmt import Stmt
+
+
+class Optimizer:
+    """
+    Rewrites the resolved program before it runs: groupings are
+    stripped, operations on literals are folded into a literal, and ifs,
+    whiles and logical operators with a literal condition are reduced to
+    the branch that would run. Operations that would fail at runtime (or
+    divide by zero) are left alone, so their errors still happen then, on
+    the operator's own line.
+    """
+
+    arithmetic = {
+        TT.MINUS.value: lambda left, right: left - right,
+        TT.SLASH.value: lambda left, right: left / right,
+        TT.STAR.value: lambda left, right: left * right,
+        TT.GREATER.value: lambda left, right: left > right,
+        TT.GREATER_EQUAL.value: lambda left, right: left >= right,
+        TT.LESS.value: lambda left, right: left < right,
+        TT.LESS_EQUAL.value: lambda left, right: left <= right,
+    }
+
+    def optimize(self, statements: list[Stmt]) -> list[Stmt]:
+        optimized: list[Stmt] = []
+        for statement in statements:
+            result = self.optimize_stmt(statement)
+            if result is not None:
+                optimized.append(result)
+
+        return optimized
+
+    def branch(self, statement: Stmt) -> Stmt:
+        # Branches and loop bodies can't be left empty.
+        result = self.optimize_stmt(statement)
+        if result is None:
+            result = stmt.Block([])
+            result.scoped = False
+
+        return result
+
+    # ------------------------- STATEMENTS -------------------------
+
+    def optimize_stmt(self, statement: Stmt) -> Stmt | None:
+        match statement:
+            case stmt.ExpressionStmt() | stmt.Print():
+                statement.expression = self.optimize_expr(statement.expression)
+            case stmt.Return():
+                if statement.value is not None:
+                    statement.value = self.optimize_expr(statement.value)
+            case stmt.Var():
+                if statement.initializer is not None:
+                    statement.initializer = self.optimize_expr(statement.initializer)
+            case stmt.Block():
+                statement.statements = self.optimize(statement.statements)
+            case stmt.Function():
+                statement.body = self.optimize(statement.body)
+            case stmt.If():
+                condition = self.optimize_expr(statement.condition)
+                if isinstance(condition, expr.Literal):
+                    if expr.is_truthy(condition.value):
+                        return self.optimize_stmt(statement.then_branch)
+                    if statement.else_branch is None:
+                        return None
+                    return self.optimize_stmt(statement.else_branch)
+
+                statement.condition = condition
+                statement.then_branch = self.branch(statement.then_branch)
+                if statement.else_branch is not None:
+                    statement.else_branch = self.branch(statement.else_branch)
+            case stmt.While():
+                statement.condition = self.optimize_expr(statement.condition)
+                if isinstance(statement.condition, expr.Literal):
+                    if not expr.is_truthy(statement.condition.value):
+                        return None
+                statement.body = self.branch(statement.body)
+            case stmt.For():
+                if statement.initializer is not None:
+                    statement.initializer = self.optimize_stmt(statement.initializer)
+                if statement.condition is not None:
+                    statement.condition = self.optimize_expr(statement.condition)
+                if statement.increment is not None:
+                    statement.increment = self.optimize_expr(statement.increment)
+                statement.body = self.branch(statement.body)
+
+        return statement
+
+    # ------------------------- EXPRESSIONS -------------------------
+
+    def optimize_expr(self, expression: Expr) -> Expr:
+        match expression:
+            case expr.Grouping():
+                return self.optimize_expr(expression.expression)
+            case expr.Assign():
+                expression.value = self.optimize_expr(expression.value)
+            case expr.Call():
+                expression.callee = self.optimize_expr(expression.callee)
+                expression.arguments = [
+                    self.optimize_expr(argument) for argument in expression.arguments
+                ]
+            case expr.Unary():
+                expression.right = self.optimize_expr(expression.right)
+                if isinstance(expression.right, expr.Literal):
+                    return self.fold_unary(expression, expression.right.value)
+            case expr.Binary():
+                expression.left = self.optimize_expr(expression.left)
+                expression.right = self.optimize_expr(expression.right)
+                if isinstance(expression.left, expr.Literal) and isinstance(
+                    expression.right, expr.Literal
+                ):
+                    return self.fold_binary(
+                        expression, expression.left.value, expression.right.value
+                    )
+            case expr.Logical():
+                expression.left = self.optimize_expr(expression.left)
+                expression.right = self.optimize_expr(expression.right)
+                if isinstance(expression.left, expr.Literal):
+                    truthy = expr.is_truthy(expression.left.value)
+                    if truthy == (expression.operator.type is TT.OR):
+                        return expression.left
+                    return expression.right
+
+        return expression
+
+    def fold_unary(self, expression: expr.Unary, right: object) -> Expr:
+        if expression.operator.type is TT.BANG:
+            return expr.Literal(not expr.is_truthy(right))
+
+        if isinstance(right, float):
+            return expr.Literal(0 - right)
+
+        return expression
+
+    def fold_binary(self, expression: expr.Binary, left: object, right: object) -> Expr:
+        operator_type = expression.operator.type
+        if operator_type is TT.EQUAL_EQUAL:
+            return expr.Literal(expr.is_equal(left, right))
+        if operator_type is TT.BANG_EQUAL:
+            return expr.Literal(not expr.is_equal(left, right))
+
+        if operator_type is TT.PLUS:
+            if isinstance(left, float) and isinstance(right, float):
+                return expr.Literal(left + right)
+            if isinstance(left, str) and isinstance(right, str):
+                return expr.Literal(left + right)
+            return expression
+
+        if not (isinstance(left, float) and isinstance(right, float)):
+            return expression
+        if operator_type is TT.SLASH and right == 0:
+            return expression
+
+        return expr.Literal(self.arithmetic[operator_type.value](left, right))
+
+
+def optimize(statements: list[Stmt]) -> list[Stmt]:
+    return Optimizer().optimize(statements)
@@ -0,0 +1,65 @@
+import atexit
+import sys
+from contextvars import ContextVar
+from typing import TextIO
+
+"""
+Where the print statement writes. Lines are collected in a buffer and
+written out in blocks instead of one write (and often one flush) per print.
+"""
+
+# When the buffer is written out: after every line, once it holds
+# `threshold` characters, or only when flushed explicitly (and at exit).
+policies: list[str] = ["line", "size", "exit"]
+
+
+class OutputSink:
+    def __init__(
+        self, stream: TextIO | None = None, policy: str = "size", threshold: int = 8192
+    ) -> None:
+        # None writes to whatever sys.stdout is at flush time.
+        self.stream: TextIO | None = stream
+        self.buffer: list[str] = []
+        self.size: int = 0
+        self.limit: int = 0
+        self.set_policy(policy, threshold)
+
+    def set_policy(self, policy: str, threshold: int = 8192) -> None:
+        if policy not in policies:
+            raise ValueError("Unknown flush policy '" + policy + "'.")
+
+        if policy == "line":
+            self.limit = 0
+        elif policy == "size":
+            self.limit = threshold
+        else:
+            self.limit = sys.maxsize
+        if self.size > self.limit:
+            self.flush()
+
+    def write_line(self, text: str) -> None:
+        self.buffer.append(text)
+        self.size += len(text) + 1
+        if self.size > self.limit:
+            self.flush()
+
+    def flush(self) -> None:
+        stream = sys.stdout if self.stream is None else self.stream
+        if len(self.buffer) > 0:
+            self.buffer.append("")
+            text = "\n".join(self.buffer)
+            self.buffer = []
+            self.size = 0
+            stream.write(text)
+        stream.flush()
+
+
+# The sink of the running program, see env.State.
+sink: ContextVar[OutputSink] = ContextVar("sink", default=OutputSink())
+
+
+def flush() -> None:
+    sink.get().flush()
+
+
+atexit.register(flush)
@@ -1,6 +1,7 @@
 from __future__ import annotations
+from typing import Iterator
 from token_type import TokenType
-from token_class import Token
+from token_class import Token, TokenStream, TokenBuffer
 from expr import Expr
 import expr
 import stmt
@@ -14,8 +15,11 @@ class ParseError(Exception):
 
 
 class Parser:
-    def __init__(self, tokens: list[Token]) -> None:
-        self.tokens: list[Token] = tokens
+    def __init__(self, tokens: TokenStream) -> None:
+        self.tokens: TokenStream = tokens
+        # Type codes are checked straight from the stream, Token objects are
+        # only built for tokens the parser keeps or reports.
+        self.types = tokens.types
         self.current: int = 0
 
     def parse(self) -> list[Stmt]:
@@ -30,7 +34,7 @@ class Parser:
     def match(self, types: list[TokenType]) -> bool:
         for lox_type in types:
             if self.check(lox_type):
-                self.advance()
+                self.current += 1
                 return True
 
         return False
@@ -49,10 +53,10 @@ class Parser:
         self.advance()
 
         while not self.is_at_end():
-            if self.previous().type is TT.SEMICOLON:
+            if self.types[self.current - 1] == TT.SEMICOLON.value:
                 return
 
-            match self.peek().type.value:
+            match self.types[self.current]:
                 case TT.CLASS.value | TT.FUN.value | TT.RETURN.value:
                     return
                 case TT.WHILE.value | TT.FOR.value | TT.IF.value:
@@ -63,10 +67,8 @@ class Parser:
             self.advance()
 
     def check(self, arg_type: TokenType) -> bool:
-        if self.is_at_end():
-            return False
-
-        return self.peek().type is arg_type
+        # No end check needed: the EOF code never matches another type.
+        return self.types[self.current] == arg_type.value
 
     def advance(self) -> Token:
         if not self.is_at_end():
@@ -75,13 +77,13 @@ class Parser:
         return self.previous()
 
     def is_at_end(self):
-        return self.peek().type is TT.EOF
+        return self.types[self.current] == TT.EOF.value
 
     def peek(self) -> Token:
-        return self.tokens[self.current]
+        return self.tokens.token(self.current)
 
     def previous(self) -> Token:
-        return self.tokens[self.current - 1]
+        return self.tokens.token(self.current - 1)
 
     # ------------------------- EXPRESSIONS -------------------------
 
@@ -235,6 +237,8 @@ class Parser:
             return self.if_statement()
         if self.match([TT.PRINT]):
             return self.print_statement()
+        if self.match([TT.RETURN]):
+            return self.return_statement()
         if self.match([TT.WHILE]):
             return self.while_statement()
         if self.match([TT.FOR]):
@@ -261,6 +265,15 @@ class Parser:
         self.consume(TT.SEMICOLON, "Expect ';' after value.")
         return stmt.Print(value)
 
+    def return_statement(self) -> stmt.Return:
+        keyword: Token = self.previous()
+        value: Expr | None = None
+        if not self.check(TT.SEMICOLON):
+            value = self.expression()
+
+        self.consume(TT.SEMICOLON, "Expect ';' after return value.")
+        return stmt.Return(keyword, value)
+
     def expression_statement(self) -> stmt.ExpressionStmt:
         expr: Expr = self.expression()
         self.consume(TT.SEMICOLON, "Expect ';' after expression.")
@@ -329,17 +342,7 @@ class Parser:
 
         body: Stmt = self.statement()
 
-        if increment is not None:
-            body = stmt.Block([body, stmt.ExpressionStmt(increment)])
-
-        if condition is None:
-            condition = expr.Literal(True)
-        body = stmt.While(condition, body)
-
-        if initializer is not None:
-            body = stmt.Block([initializer, body])
-
-        return body
+        return stmt.For(initializer, condition, increment, body)
 
     def function(self, kind: str) -> stmt.Function:
         name: Token = self.consume(TT.IDENTIFIER, "Expect " + kind + " name.")
@@ -360,3 +363,35 @@ class Parser:
         body: list[Stmt] = self.block()
 
         return stmt.Function(name, params, body)
+
+
+class StreamingParser(Parser):
+    """
+    Parser pulling tokens from a TokenBuffer on demand. declarations()
+    yields each top-level declaration as soon as it is parsed and then
+    forgets its tokens.
+    """
+
+    def __init__(self, tokens: TokenBuffer) -> None:
+        self.tokens: TokenBuffer = tokens  # type: ignore
+        self.types = tokens.types
+        self.current: int = 0
+
+    def declarations(self) -> Iterator[Stmt | None]:
+        while not self.is_at_end():
+            declaration = self.declaration()
+            self.tokens.trim(self.current)
+            self.current = 0
+            yield declaration
+
+    def check(self, arg_type: TokenType) -> bool:
+        self.tokens.fill(self.current)
+        return self.types[self.current] == arg_type.value
+
+    def is_at_end(self):
+        self.tokens.fill(self.current)
+        return self.types[self.current] == TT.EOF.value
+
+    def peek(self) -> Token:
+        self.tokens.fill(self.current)
+        return self.tokens.token(self.current)
@@ -0,0 +1,150 @@
+import time
+from typing import Callable, TextIO
+from expr import Expr
+from stmt import Stmt
+from token_class import Token
+
+"""
+Profiler for the tree-walking backend. While it is running, the interpret
+method of every node class is replaced by a wrapper that counts the call
+and times it; stopping puts the original methods back. Nothing is patched
+when profiling is off, so the normal path has no extra cost.
+"""
+
+# Attributes holding a node's own token, then the children its line can be
+# taken from when it has none.
+TOKEN_FIELDS = ["operator", "name", "paren", "keyword"]
+CHILD_FIELDS = ["expression", "condition", "initializer", "left", "callee", "value"]
+
+
+def node_line(node: Expr | Stmt) -> int | None:
+    for field in TOKEN_FIELDS:
+        lox_token = getattr(node, field, None)
+        if isinstance(lox_token, Token):
+            return lox_token.line
+
+    for field in CHILD_FIELDS:
+        child = getattr(node, field, None)
+        if isinstance(child, (Expr, Stmt)):
+            line = node_line(child)
+            if line is not None:
+                return line
+
+    statements = getattr(node, "statements", None)
+    if isinstance(statements, list) and len(statements) > 0:
+        return node_line(statements[0])
+
+    return None
+
+
+class NodeStats:
+    __slots__ = ("kind", "line", "count", "total", "own", "active")
+
+    def __init__(self, kind: str, line: int | None) -> None:
+        self.kind: str = kind
+        self.line: int | None = line
+        self.count: int = 0
+        # Time including the nodes evaluated under this one, and without.
+        self.total: float = 0.0
+        self.own: float = 0.0
+        # Evaluations of the node in progress, under recursion only the
+        # outermost one adds to the total.
+        self.active: int = 0
+
+
+class NodeProfiler:
+    def __init__(self) -> None:
+        self.stats: dict[int, NodeStats] = {}
+        self.originals: dict[type, Callable] = {}
+        # Time spent in the children of each node being evaluated.
+        self.children: list[float] = [0.0]
+
+    def node_classes(self) -> list[type]:
+        # Subclasses of subclasses too, like the specialized Binary nodes.
+        classes: list[type] = []
+        pending: list[type] = [Expr, Stmt]
+        while len(pending) > 0:
+            for node_class in pending.pop().__subclasses__():
+                pending.append(node_class)
+                if "interpret" in node_class.__dict__:
+                    classes.append(node_class)
+
+        return classes
+
+    def start(self) -> None:
+        for node_class in self.node_classes():
+            original = node_class.__dict__["interpret"]
+            self.originals[node_class] = original
+            node_class.interpret = self.wrap(original)  # type: ignore
+
+    def stop(self) -> None:
+        for node_class, original in self.originals.items():
+            node_class.interpret = original  # type: ignore
+        self.originals = {}
+
+    def wrap(self, original: Callable) -> Callable:
+        stats = self.stats
+        children = self.children
+        clock = time.perf_counter
+
+        def interpret(node):
+            node_stats = stats.get(id(node))
+            if node_stats is None:
+                node_stats = NodeStats(type(node).__name__, node_line(node))
+                stats[id(node)] = node_stats
+
+            node_stats.active += 1
+            children.append(0.0)
+            start = clock()
+            try:
+                return original(node)
+            finally:
+                elapsed = clock() - start
+                own = elapsed - children.pop()
+                children[-1] += elapsed
+                node_stats.active -= 1
+                node_stats.count += 1
+                node_stats.own += own
+                if node_stats.active == 0:
+                    node_stats.total += elapsed
+
+        return interpret
+
+    def report(self, stream: TextIO, limit: int = 20) -> None:
+        nodes = sorted(self.stats.values(), key=lambda stats: stats.own, reverse=True)
+        stream.write("Hot nodes, by time spent in the node itself:\n")
+        stream.write(
+            "    line  node".ljust(30) + "count".rjust(12) + "own ms".rjust(12)
+        )
+        stream.write("total ms".rjust(12) + "\n")
+        for stats in nodes[:limit]:
+            line = "-" if stats.line is None else str(stats.line)
+            stream.write(
+                line.rjust(8)
+                + "  "
+                + stats.kind.ljust(20)
+                + str(stats.count).rjust(12)
+                + format(stats.own * 1000, ".2f").rjust(12)
+                + format(stats.total * 1000, ".2f").rjust(12)
+                + "\n"
+            )
+
+        lines: dict[int | None, list[float]] = {}
+        for stats in self.stats.values():
+            line_stats = lines.setdefault(stats.line, [0, 0.0])
+            line_stats[0] += stats.count
+            line_stats[1] += stats.own
+
+        hot_lines = sorted(lines.items(), key=lambda item: item[1][1], reverse=True)
+        stream.write("\nHot lines:\n")
+        stream.write(
+            "    line".ljust(30) + "evals".rjust(12) + "own ms".rjust(12) + "\n"
+        )
+        for line, (count, own) in hot_lines[:limit]:
+            stream.write(
+                ("-" if line is None else str(line)).rjust(8)
+                + " " * 22
+                + str(count).rjust(12)
+                + format(own * 1000, ".2f").rjust(12)
+                + "\n"
+            )
@@ -0,0 +1,257 @@
+import mmap
+import re
+import sys
+from typing import Iterable, Iterator
+import error
+from scanner import Scanner
+from token_class import Token, TokenStream, MappedTokenStream
+from token_type import TokenType
+import token_type_instances as TT
+
+# Group numbers of the alternatives in RegexScanner.pattern.
+BLANK = 1
+COMMENT = 2
+NUMBER = 3
+IDENTIFIER = 4
+STRING = 5
+UNTERMINATED = 6
+OPERATOR = 7
+UNEXPECTED = 8
+
+
+class RegexScanner:
+    """
+    Drop-in replacement for Scanner that lexes with one compiled master
+    pattern instead of a method call per character. It produces the same
+    TokenStream, lines and error messages as Scanner.
+    """
+
+    # Blanks before a token are skipped as part of its match, newlines are
+    # matched on their own so lines can be counted. Alternatives are tried
+    # in order; the last one catches any other character, which is an error.
+    pattern: re.Pattern = re.compile(
+        r"""
+        [ \t\r]*
+        (?:(\n[ \t\r\n]*)
+        |(//[^\n]*)
+        |([0-9]+(?:\.[0-9]+)?)
+        |([A-Za-z_][A-Za-z0-9_]*)
+        |("[^"]*")
+        |("[^"]*)
+        |(!=|==|<=|>=|[(){},.\-+;*/!=<>])
+        |([^ \t\r]))
+        """,
+        re.VERBOSE | re.DOTALL,
+    )
+
+    operators: dict[str, TokenType] = {
+        "(": TT.LEFT_PAREN,
+        ")": TT.RIGHT_PAREN,
+        "{": TT.LEFT_BRACE,
+        "}": TT.RIGHT_BRACE,
+        ",": TT.COMMA,
+        ".": TT.DOT,
+        "-": TT.MINUS,
+        "+": TT.PLUS,
+        ";": TT.SEMICOLON,
+        "*": TT.STAR,
+        "/": TT.SLASH,
+        "!": TT.BANG,
+        "!=": TT.BANG_EQUAL,
+        "=": TT.EQUAL,
+        "==": TT.EQUAL_EQUAL,
+        ">": TT.GREATER,
+        ">=": TT.GREATER_EQUAL,
+        "<": TT.LESS,
+        "<=": TT.LESS_EQUAL,
+    }
+
+    def __init__(self, source: str) -> None:
+        self.source: str = source
+        self.tokens: TokenStream = TokenStream(source)
+        self.line: int = 1
+
+    def scan_tokens(self) -> TokenStream:
+        # The arrays are appended to directly, this loop is the hot path.
+        types = self.tokens.types.append
+        starts = self.tokens.starts.append
+        ends = self.tokens.ends.append
+        lines = self.tokens.lines.append
+
+        keywords = Scanner.keywords
+        operators = {text: type.value for text, type in self.operators.items()}
+        identifier = TT.IDENTIFIER.value
+        number = TT.NUMBER.value
+        string = TT.STRING.value
+        line = 1
+
+        for match in self.pattern.finditer(self.source):
+            kind = match.lastindex
+            if kind == BLANK:
+                line += match.group(kind).count("\n")
+                continue
+
+            if kind == IDENTIFIER:
+                word = keywords.get(match.group(kind))
+                types(identifier if word is None else word.value)
+            elif kind == OPERATOR:
+                types(operators[match.group(kind)])
+            elif kind == NUMBER:
+                types(number)
+            elif kind == COMMENT:
+                continue
+            elif kind == STRING:
+                line += match.group(kind).count("\n")
+                types(string)
+            elif kind == UNTERMINATED:
+                line += match.group(kind).count("\n")
+                error.line_error(line, "Unterminated string.")
+                continue
+            else:
+                error.line_error(line, "Unexpected character.")
+                continue
+
+            start, end = match.span(kind)
+            starts(start)
+            ends(end)
+            lines(line)
+
+        self.line = line
+        end = len(self.source)
+        self.tokens.add(TT.EOF, end, end, line)
+        return self.tokens
+
+
+class MappedScanner:
+    """
+    RegexScanner for a memory-mapped file: it matches a bytes pattern
+    straight over the mapping, so the source is never read into a str.
+    Lexemes and lines are filled in lazily by MappedTokenStream.
+    """
+
+    # Same as RegexScanner.pattern, except that a non-ASCII character is
+    # several bytes and must be reported as one unexpected character.
+    pattern: re.Pattern = re.compile(
+        rb"""
+        [ \t\r]*
+        (?:(\n[ \t\r\n]*)
+        |(//[^\n]*)
+        |([0-9]+(?:\.[0-9]+)?)
+        |([A-Za-z_][A-Za-z0-9_]*)
+        |("[^"]*")
+        |("[^"]*)
+        |(!=|==|<=|>=|[(){},.\-+;*/!=<>])
+        |([\xc0-\xff][\x80-\xbf]*|[^ \t\r]))
+        """,
+        re.VERBOSE | re.DOTALL,
+    )
+
+    def __init__(self, source: bytes | mmap.mmap) -> None:
+        self.source: bytes | mmap.mmap = source
+        self.tokens: MappedTokenStream = MappedTokenStream(source)
+
+    def scan_tokens(self) -> MappedTokenStream:
+        types = self.tokens.types.append
+        starts = self.tokens.starts.append
+        ends = self.tokens.ends.append
+
+        keywords = {
+            text.encode(): type.value for text, type in Scanner.keywords.items()
+        }
+        operators = {
+            text.encode(): type.value for text, type in RegexScanner.operators.items()
+        }
+        identifier = TT.IDENTIFIER.value
+        number = TT.NUMBER.value
+        string = TT.STRING.value
+
+        for match in self.pattern.finditer(self.source):
+            kind = match.lastindex
+            if kind == BLANK or kind == COMMENT:
+                continue
+
+            if kind == IDENTIFIER:
+                types(keywords.get(match.group(kind), identifier))
+            elif kind == OPERATOR:
+                types(operators[match.group(kind)])
+            elif kind == NUMBER:
+                types(number)
+            elif kind == STRING:
+                types(string)
+            elif kind == UNTERMINATED:
+                line = self.tokens.line_at(match.end(kind))
+                error.line_error(line, "Unterminated string.")
+                continue
+            else:
+                line = self.tokens.line_at(match.start(kind))
+                error.line_error(line, "Unexpected character.")
+                continue
+
+            start, end = match.span(kind)
+            starts(start)
+            ends(end)
+
+        types(TT.EOF.value)
+        starts(len(self.source))
+        ends(len(self.source))
+        return self.tokens
+
+
+class StreamScanner:
+    """
+    Generator version of RegexScanner for streaming execution: it reads the
+    source one line at a time and yields Token objects as soon as they are
+    complete, so the whole source never has to be in memory. Only a string
+    literal spanning several lines is held back until it is closed.
+    """
+
+    def __init__(self, lines: Iterable[str]) -> None:
+        self.lines: Iterable[str] = lines
+        self.line: int = 1
+        self.pending: str = ""
+
+    def scan_tokens(self) -> Iterator[Token]:
+        for chunk in self.lines:
+            if len(self.pending) > 0 and '"' not in chunk:
+                self.pending += chunk
+                continue
+
+            text = self.pending + chunk
+            self.pending = ""
+            yield from self.scan_text(text, False)
+
+        yield from self.scan_text(self.pending, True)
+        yield Token(TT.EOF, "", None, self.line)
+
+    def scan_text(self, text: str, final: bool) -> Iterator[Token]:
+        keywords = Scanner.keywords
+        operators = RegexScanner.operators
+
+        for match in RegexScanner.pattern.finditer(text):
+            kind = match.lastindex
+            lexeme = match.group(kind)
+            if kind == BLANK:
+                self.line += lexeme.count("\n")
+            elif kind == IDENTIFIER:
+                word = keywords.get(lexeme)
+                if word is None:
+                    yield Token(TT.IDENTIFIER, sys.intern(lexeme), None, self.line)
+                else:
+                    yield Token(word, lexeme, None, self.line)
+            elif kind == OPERATOR:
+                yield Token(operators[lexeme], lexeme, None, self.line)
+            elif kind == NUMBER:
+                yield Token(TT.NUMBER, lexeme, float(lexeme), self.line)
+            elif kind == STRING:
+                self.line += lexeme.count("\n")
+                literal = sys.intern(lexeme[1:-1])
+                yield Token(TT.STRING, lexeme, literal, self.line)
+            elif kind == UNTERMINATED:
+                if not final:
+                    # A later line may still close it.
+                    self.pending = lexeme
+                    return
+                self.line += lexeme.count("\n")
+                error.line_error(self.line, "Unterminated string.")
+            elif kind == UNEXPECTED:
+                error.line_error(self.line, "Unexpected character.")
@@ -0,0 +1,157 @@
+import expr
+import stmt
+import error
+from expr import Expr
+from stmt import Stmt
+from token_class import Token
+
+
+class Scope:
+    def __init__(self) -> None:
+        self.slots: dict[str, int] = {}
+        # Slots handed out, a name declared again gets a new one.
+        self.size: int = 0
+
+
+class Resolver:
+    """
+    Static pass run between parsing and execution. Every local variable
+    reference gets its lexical address: how many environments to hop
+    (depth) and its index in that environment (slot). References that are
+    not found in any local scope are left unresolved and read from globals.
+    """
+
+    def __init__(self) -> None:
+        self.scopes: list[Scope] = []
+        self.in_function: bool = False
+
+    def resolve(self, statements: list[Stmt]) -> None:
+        for statement in statements:
+            self.resolve_stmt(statement)
+
+    # ------------------------- SCOPES -------------------------
+
+    def begin_scope(self) -> None:
+        self.scopes.append(Scope())
+
+    def end_scope(self) -> None:
+        self.scopes.pop()
+
+    def declare(self, name: Token) -> int | None:
+        if len(self.scopes) == 0:
+            return None
+
+        scope = self.scopes[-1]
+        slot = scope.size
+        scope.slots[name.lexeme] = slot
+        scope.size += 1
+        return slot
+
+    def resolve_local(self, node: expr.Variable | expr.Assign, name: Token) -> None:
+        for depth in range(len(self.scopes)):
+            scope = self.scopes[len(self.scopes) - 1 - depth]
+            slot = scope.slots.get(name.lexeme)
+            if slot is not None:
+                node.depth = depth
+                node.slot = slot
+                return
+
+    def resolve_function(self, function: stmt.Function) -> None:
+        # Functions don't capture their surrounding scopes, their environment
+        # is always enclosed by globals (see LoxFunction.call).
+        enclosing = self.scopes
+        enclosing_function = self.in_function
+        self.scopes = []
+        self.in_function = True
+        self.begin_scope()
+
+        for param in function.params:
+            self.declare(param)
+        self.resolve(function.body)
+        function.size = self.scopes[-1].size
+
+        self.end_scope()
+        self.scopes = enclosing
+        self.in_function = enclosing_function
+
+    # ------------------------- STATEMENTS -------------------------
+
+    def resolve_stmt(self, statement: Stmt) -> None:
+        match statement:
+            case stmt.Block():
+                if not any(
+                    isinstance(inner, (stmt.Var, stmt.Function))
+                    for inner in statement.statements
+                ):
+                    # Nothing to scope: no environment at runtime either.
+                    statement.scoped = False
+                    self.resolve(statement.statements)
+                    return
+
+                self.begin_scope()
+                self.resolve(statement.statements)
+                statement.size = self.scopes[-1].size
+                self.end_scope()
+            case stmt.Var():
+                # The initializer still sees an outer variable of the same
+                # name, the new one only exists once it is evaluated.
+                if statement.initializer is not None:
+                    self.resolve_expr(statement.initializer)
+                statement.slot = self.declare(statement.name)
+            case stmt.Function():
+                statement.slot = self.declare(statement.name)
+                self.resolve_function(statement)
+            case stmt.ExpressionStmt() | stmt.Print():
+                self.resolve_expr(statement.expression)
+            case stmt.Return():
+                if not self.in_function:
+                    error.token_error(
+                        statement.keyword, "Can't return from top-level code."
+                    )
+                if statement.value is not None:
+                    self.resolve_expr(statement.value)
+            case stmt.If():
+                self.resolve_expr(statement.condition)
+                self.resolve_stmt(statement.then_branch)
+                if statement.else_branch is not None:
+                    self.resolve_stmt(statement.else_branch)
+            case stmt.While():
+                self.resolve_expr(statement.condition)
+                self.resolve_stmt(statement.body)
+            case stmt.For():
+                scoped = isinstance(statement.initializer, stmt.Var)
+                if scoped:
+                    self.begin_scope()
+                if statement.initializer is not None:
+                    self.resolve_stmt(statement.initializer)
+                if statement.condition is not None:
+                    self.resolve_expr(statement.condition)
+                if statement.increment is not None:
+                    self.resolve_expr(statement.increment)
+                self.resolve_stmt(statement.body)
+                if scoped:
+                    statement.size = self.scopes[-1].size
+                    self.end_scope()
+
+    # ------------------------- EXPRESSIONS -------------------------
+
+    def resolve_expr(self, expression: Expr) -> None:
+        match expression:
+            case expr.Variable():
+                self.resolve_local(expression, expression.name)
+            case expr.Assign():
+                self.resolve_expr(expression.value)
+                self.resolve_local(expression, expression.name)
+            case expr.Binary() | expr.Logical():
+                self.resolve_expr(expression.left)
+                self.resolve_expr(expression.right)
+            case expr.Unary():
+                self.resolve_expr(expression.right)
+            case expr.Grouping():
+                self.resolve_expr(expression.expression)
+            case expr.Call():
+                self.resolve_expr(expression.callee)
+                for argument in expression.arguments:
+                    self.resolve_expr(argument)
+            case expr.Literal():
+                pass
@@ -0,0 +1,67 @@
+"""
+Lox strings built with + are Python strs while they are short. Past
+ROPE_LENGTH characters a concatenation returns a Rope instead, which only
+records the pieces, so building a string in a loop costs linear time
+rather than a copy of everything so far on every step. A rope is joined
+into a str the first time it is printed, compared or handed to a native.
+"""
+
+# Creating a Rope costs about as much as copying a few thousand characters,
+# shorter strings stay strs.
+ROPE_LENGTH = 8192
+
+
+class Rope:
+    __slots__ = ("parts", "count", "flat")
+
+    def __init__(self, parts: list[str], count: int) -> None:
+        # The list is shared with the ropes built by appending to this one,
+        # each of which only owns the first count pieces.
+        self.parts: list[str] = parts
+        self.count: int = count
+        self.flat: str | None = None
+
+    def __str__(self) -> str:
+        if self.flat is None:
+            if self.count == len(self.parts):
+                self.flat = "".join(self.parts)
+            else:
+                self.flat = "".join(self.parts[: self.count])
+        return self.flat
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (str, Rope)):
+            return str(self) == str(other)
+        return False
+
+    def __hash__(self) -> int:
+        # Equal to the str it joins into, so it must hash like one.
+        return hash(str(self))
+
+
+# What a Lox string value can be.
+STRINGS = (str, Rope)
+
+
+def concat(left: str | Rope, right: str | Rope) -> str | Rope:
+    if isinstance(right, Rope):
+        right = str(right)
+
+    if left.__class__ is Rope:
+        parts = left.parts  # type: ignore
+        if left.count < len(parts):  # type: ignore
+            # Another string was already built on this one, keep it intact.
+            parts = parts[: left.count]  # type: ignore
+        parts.append(right)
+        return Rope(parts, len(parts))
+
+    text = left + right  # type: ignore
+    if len(text) < ROPE_LENGTH:
+        return text
+    return Rope([text], 1)
+
+
+def flatten(value: object) -> object:
+    if isinstance(value, Rope):
+        return str(value)
+    return value
@@ -0,0 +1,135 @@
+import threading
+import time
+from typing import Callable
+import expr
+import stmt
+from vm import VM
+
+"""
+Sampling profiler working at the level of Lox functions. A background
+thread periodically records the current Lox call stack (function names and
+the lines they were called from) and the samples are written out as
+collapsed stacks, one "frame;frame;frame count" line per distinct stack,
+the input format of flamegraph.pl and similar tools.
+
+The tree-walker has no call stack of its own, so one is kept by patching
+Call.interpret and LoxFunction.call while sampling; the VM's frames are
+read as they are. Nothing is patched when the sampler isn't running.
+"""
+
+ROOT = "<script>"
+
+
+def frame_name(name: str, line: int | None) -> str:
+    if line is None:
+        return name
+    return name + " (line " + str(line) + ")"
+
+
+class StackSampler:
+    def __init__(self, interval: float = 0.001) -> None:
+        self.interval: float = interval
+        self.counts: dict[str, int] = {}
+        # Tree-walker call stack: the line of every call being evaluated,
+        # and the Lox functions entered, with their call-site line.
+        self.call_lines: list[int] = []
+        self.frames: list[tuple[str, int]] = []
+        self.vms: list[VM] = []
+        self.originals: list[tuple[type, str, Callable]] = []
+        self.running: bool = False
+        self.thread: threading.Thread | None = None
+
+    # ------------------------- CALL STACK -------------------------
+
+    def patch(self, owner: type, name: str, wrapper: Callable) -> None:
+        original = owner.__dict__[name]
+        self.originals.append((owner, name, original))
+        setattr(owner, name, wrapper(original))
+
+    def wrap_call_expr(self, original: Callable) -> Callable:
+        call_lines = self.call_lines
+
+        def interpret(node: expr.Call) -> object:
+            call_lines.append(node.paren.line)
+            try:
+                return original(node)
+            finally:
+                call_lines.pop()
+
+        return interpret
+
+    def wrap_function_call(self, original: Callable) -> Callable:
+        call_lines = self.call_lines
+        frames = self.frames
+
+        def call(function: stmt.LoxFunction, arguments: list[object]) -> object:
+            line = call_lines[-1] if len(call_lines) > 0 else None
+            frames.append((function.declaration.name.lexeme, line))  # type: ignore
+            try:
+                return original(function, arguments)
+            finally:
+                frames.pop()
+
+        return call
+
+    def wrap_vm_interpret(self, original: Callable) -> Callable:
+        vms = self.vms
+
+        def interpret(vm: VM, function) -> None:
+            vms.append(vm)
+            try:
+                original(vm, function)
+            finally:
+                vms.pop()
+
+        return interpret
+
+    # ------------------------- SAMPLING -------------------------
+
+    def start(self) -> None:
+        self.patch(expr.Call, "interpret", self.wrap_call_expr)
+        self.patch(stmt.LoxFunction, "call", self.wrap_function_call)
+        self.patch(VM, "interpret", self.wrap_vm_interpret)
+
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+        for owner, name, original in reversed(self.originals):
+            setattr(owner, name, original)
+        self.originals = []
+
+    def run(self) -> None:
+        while self.running:
+            time.sleep(self.interval)
+            self.sample()
+
+    def current_stack(self) -> list[str]:
+        stack = [ROOT]
+        for name, line in self.frames[:]:
+            stack.append(frame_name(name, line))
+
+        for vm in self.vms[:]:
+            frames = vm.frames[:]
+            for i in range(1, len(frames)):
+                caller = frames[i - 1]
+                line = caller.function.chunk.lines[caller.ip - 1]
+                stack.append(frame_name(frames[i].function.name, line))
+
+        return stack
+
+    def sample(self) -> None:
+        collapsed = ";".join(self.current_stack())
+        self.counts[collapsed] = self.counts.get(collapsed, 0) + 1
+
+    def write(self, path: str) -> None:
+        collapsed_file = open(path, "w")
+        for stack, count in sorted(self.counts.items()):
+            collapsed_file.write(stack + " " + str(count) + "\n")
+        collapsed_file.close()
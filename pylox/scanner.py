@@ -1,5 +1,5 @@
 import error
-from token_class import Token
+from token_class import TokenStream
 from token_type import TokenType
 import token_type_instances as TT
 
@@ -26,17 +26,18 @@ class Scanner:
 
     def __init__(self, source: str) -> None:
         self.source: str = source
-        self.tokens: list[Token] = []
+        self.tokens: TokenStream = TokenStream(source)
         self.start: int = 0
         self.current: int = 0
         self.line: int = 1
 
-    def scan_tokens(self) -> list[Token]:
+    def scan_tokens(self) -> TokenStream:
         while not self.is_at_end():
             self.start = self.current
             self.scan_token()
 
-        self.tokens.append(Token(TT.EOF, "", None, self.line))
+        end = len(self.source)
+        self.tokens.add(TT.EOF, end, end, self.line)
         return self.tokens
 
     def is_at_end(self) -> bool:
@@ -47,9 +48,10 @@ class Scanner:
         self.current += 1
         return character
 
-    def add_token(self, type: TokenType, literal: object = None) -> None:  # PyLoxNULL
-        text: str = self.source[self.start : self.current]  # Check for correctness
-        self.tokens.append(Token(type, text, literal, self.line))
+    def add_token(self, type: TokenType) -> None:
+        # The lexeme and literal are sliced from the source by TokenStream
+        # when the parser needs them.
+        self.tokens.add(type, self.start, self.current, self.line)
 
     def scan_token(self) -> None:
         character = self.advance()
@@ -134,9 +136,7 @@ class Scanner:
             return
 
         self.advance()
-
-        substr: str = self.source[self.start + 1 : self.current - 1]
-        self.add_token(TT.STRING, substr)
+        self.add_token(TT.STRING)
 
     def is_digit(self, c: str) -> bool:
         return "0" <= c <= "9"
@@ -152,8 +152,7 @@ class Scanner:
             while self.is_digit(self.peek()):
                 self.advance()
 
-        new_number = float(self.source[self.start : self.current])
-        self.add_token(TT.NUMBER, new_number)
+        self.add_token(TT.NUMBER)
 
     def peek_next(self) -> str:
         if self.current + 1 >= len(self.source):
@@ -1,15 +1,22 @@
 import expr
 import env
+import output
 from lox_callable import LoxCallable
 from expr import Expr
 from token_class import Token
 
+# What interpret() returns: None when the statement completed normally, or
+# a 1-tuple with the value of an executed return statement. Every enclosing
+# statement hands it up to LoxFunction.call, which is much cheaper than
+# unwinding the Python stack with an exception.
+Completion = tuple[object] | None
+
 
 class Stmt:
     def __init__(self) -> None:
         raise NotImplementedError
 
-    def interpret(self) -> None:
+    def interpret(self) -> Completion:
         raise NotImplementedError
 
 
@@ -27,28 +34,45 @@ class Print(Stmt):
 
     def interpret(self) -> None:
         value: object = self.expression.interpret()
-        print(expr.stringify(value))
+        output.sink.get().write_line(expr.stringify(value))
 
 
 class Var(Stmt):
     def __init__(self, name: Token, initializer: Expr | None) -> None:
         self.name: Token = name
         self.initializer: Expr | None = initializer
+        self.slot: int | None = None
 
     def interpret(self) -> None:
         value = None
         if isinstance(self.initializer, Expr):
             value = self.initializer.interpret()
 
-        env.instance.define(self.name.lexeme, value)
+        if self.slot is None:
+            env.state.get().globals.define(self.name.lexeme, value)
+        else:
+            env.state.get().instance.values[self.slot] = value  # type: ignore
 
 
 class Block(Stmt):
     def __init__(self, statements: list[Stmt]) -> None:
         self.statements = statements
+        # Number of variables declared directly in the block, see Resolver.
+        self.size: int = 0
+        # Blocks that declare nothing run in the enclosing environment.
+        self.scoped: bool = True
 
-    def interpret(self) -> None:
-        execute_block(self.statements, env.Environment(env.instance))
+    def interpret(self) -> Completion:
+        if not self.scoped:
+            for statement in self.statements:
+                completion = statement.interpret()
+                if completion is not None:
+                    return completion
+            return None
+
+        return execute_block(
+            self.statements, env.Frame([None] * self.size, env.state.get().instance)
+        )
 
 
 class If(Stmt):
@@ -59,11 +83,12 @@ class If(Stmt):
         self.then_branch: Stmt = then_branch
         self.else_branch: Stmt | None = else_branch
 
-    def interpret(self) -> None:
+    def interpret(self) -> Completion:
         if expr.is_truthy(self.condition.interpret()):
-            self.then_branch.interpret()
+            return self.then_branch.interpret()
         elif self.else_branch is not None:
-            self.else_branch.interpret()
+            return self.else_branch.interpret()
+        return None
 
 
 class While(Stmt):
@@ -71,9 +96,67 @@ class While(Stmt):
         self.condition: Expr = condition
         self.body: Stmt = body
 
-    def interpret(self) -> None:
+    def interpret(self) -> Completion:
         while expr.is_truthy(self.condition.interpret()):
-            self.body.interpret()
+            completion = self.body.interpret()
+            if completion is not None:
+                return completion
+        return None
+
+
+class For(Stmt):
+    def __init__(
+        self,
+        initializer: Stmt | None,
+        condition: Expr | None,
+        increment: Expr | None,
+        body: Stmt,
+    ) -> None:
+        self.initializer: Stmt | None = initializer
+        self.condition: Expr | None = condition
+        self.increment: Expr | None = increment
+        self.body: Stmt = body
+        # 1 when the initializer declares the loop variable, which gets a
+        # scope of its own. Nothing is allocated per iteration.
+        self.size: int = 0
+
+    def interpret(self) -> Completion:
+        if self.size == 0:
+            return self.loop()
+
+        state = env.state.get()
+        previous: env.Environment | env.Frame = state.instance
+        try:
+            state.instance = env.Frame([None] * self.size, previous)
+            return self.loop()
+        finally:
+            state.instance = previous
+
+    def loop(self) -> Completion:
+        if self.initializer is not None:
+            self.initializer.interpret()
+
+        condition = self.condition
+        increment = self.increment
+        body = self.body
+        while condition is None or expr.is_truthy(condition.interpret()):
+            completion = body.interpret()
+            if completion is not None:
+                return completion
+            if increment is not None:
+                increment.interpret()
+        return None
+
+
+class Return(Stmt):
+    def __init__(self, keyword: Token, value: Expr | None) -> None:
+        self.keyword: Token = keyword
+        self.value: Expr | None = value
+
+    def interpret(self) -> Completion:
+        if self.value is None:
+            return (None,)
+        return (self.value.interpret(),)
 
 
 class Function(Stmt):
@@ -81,10 +164,16 @@ class Function(Stmt):
         self.name: Token = name
         self.params: list[Token] = params
         self.body: list[Stmt] = body
+        self.slot: int | None = None
+        # Parameters plus the variables declared in the body.
+        self.size: int = 0
 
     def interpret(self) -> None:
         function: LoxFunction = LoxFunction(self)
-        env.instance.define(self.name.lexeme, function)
+        if self.slot is None:
+            env.state.get().globals.define(self.name.lexeme, function)
+        else:
+            env.state.get().instance.values[self.slot] = function  # type: ignore
 
 
 class LoxFunction(LoxCallable):
@@ -92,11 +181,13 @@ class LoxFunction(LoxCallable):
         self.declaration: Function = declaration
 
     def call(self, arguments: list[object]):
-        environment: env.Environment = env.Environment(env.globals)
-        for i in range(len(self.declaration.params)):
-            environment.define(self.declaration.params[i].lexeme, arguments[i])
+        locals_count = self.declaration.size - len(arguments)
+        frame = env.Frame(arguments + [None] * locals_count, env.state.get().globals)
 
-        execute_block(self.declaration.body, environment)
+        completion = execute_block(self.declaration.body, frame)
+        if completion is None:
+            return None
+        return completion[0]
 
     def arity(self):
         return len(self.declaration.params)
@@ -105,12 +196,16 @@ class LoxFunction(LoxCallable):
         return "<fn " + self.declaration.name.lexeme + ">"
 
 
-def execute_block(statements: list[Stmt], environment: env.Environment):
-    previous: env.Environment = env.instance
+def execute_block(statements: list[Stmt], environment: env.Frame) -> Completion:
+    state = env.state.get()
+    previous: env.Environment | env.Frame = state.instance
     try:
-        env.instance = environment
+        state.instance = environment
 
         for statement in statements:
-            statement.interpret()
+            completion = statement.interpret()
+            if completion is not None:
+                return completion
+        return None
     finally:
-        env.instance = previous
+        state.instance = previous
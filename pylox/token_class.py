@@ -1,7 +1,16 @@
+import mmap
+import re
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Iterator
 from token_type import TokenType
+import token_type_instances as TT
 
 
 class Token:
+    __slots__ = ("type", "lexeme", "literal", "line")
+
     def __init__(
         self, type: TokenType, lexeme: str, literal: object, line: int
     ) -> None:
@@ -12,3 +21,112 @@ class Token:
 
     def __str__(self) -> str:
         return str(self.type) + " " + str(self.lexeme) + " " + str(self.literal)
+
+
+class TokenStream:
+    """
+    Scanner output stored as parallel arrays (type code, start and end
+    offsets into the source, line) instead of one object per token.
+    Token objects, with their lexeme and literal, are only built when the
+    parser asks for one.
+    """
+
+    def __init__(self, source: str) -> None:
+        self.source: str = source
+        self.types: array = array("B")
+        self.starts: array = array("I")
+        self.ends: array = array("I")
+        self.lines: array = array("I")
+
+    def add(self, type: TokenType, start: int, end: int, line: int) -> None:
+        self.types.append(type.value)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.lines.append(line)
+
+    def token(self, index: int) -> Token:
+        type = TT.by_value[self.types[index]]
+        lexeme = self.source[self.starts[index] : self.ends[index]]
+
+        # Names and string literals are interned, every use of a name then
+        # shares one str and dict lookups succeed on identity.
+        literal: object = None
+        if type is TT.IDENTIFIER:
+            lexeme = sys.intern(lexeme)
+        elif type is TT.NUMBER:
+            literal = float(lexeme)
+        elif type is TT.STRING:
+            literal = sys.intern(lexeme[1:-1])
+
+        return Token(type, lexeme, literal, self.lines[index])
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+
+class MappedTokenStream(TokenStream):
+    """
+    TokenStream over the UTF-8 bytes of a memory-mapped file. Offsets are
+    byte offsets, lexemes are decoded only when a Token is built, and lines
+    aren't stored per token: they are looked up in an index of newline
+    offsets that is built the first time a line is needed.
+    """
+
+    def __init__(self, source: bytes | mmap.mmap) -> None:
+        super().__init__("")
+        self.data: bytes | mmap.mmap = source
+        # 64-bit offsets, a mapped file can be larger than 4 GiB.
+        self.starts = array("Q")
+        self.ends = array("Q")
+        self.newlines: array | None = None
+
+    def line_at(self, offset: int) -> int:
+        if self.newlines is None:
+            found = re.finditer(b"\n", self.data)
+            self.newlines = array("Q", (match.start() for match in found))
+
+        return bisect_left(self.newlines, offset) + 1
+
+    def token(self, index: int) -> Token:
+        type = TT.by_value[self.types[index]]
+        start = self.starts[index]
+        end = self.ends[index]
+        lexeme = self.data[start:end].decode("utf-8")
+
+        literal: object = None
+        if type is TT.IDENTIFIER:
+            lexeme = sys.intern(lexeme)
+        elif type is TT.NUMBER:
+            literal = float(lexeme)
+        elif type is TT.STRING:
+            literal = sys.intern(lexeme[1:-1])
+            # Like the other scanners, a string is on the line it ends on.
+            start = end
+
+        return Token(type, lexeme, literal, self.line_at(start))
+
+
+class TokenBuffer:
+    """
+    TokenStream look-alike fed from a token generator. The parser asks for
+    tokens with fill() as it reaches them, and trim() drops the ones it is
+    done with, so only the tokens of the current declaration are held.
+    """
+
+    def __init__(self, tokens: Iterator[Token]) -> None:
+        self.source: Iterator[Token] = tokens
+        self.types: array = array("B")
+        self.buffered: list[Token] = []
+
+    def fill(self, index: int) -> None:
+        while len(self.buffered) <= index:
+            lox_token = next(self.source)
+            self.buffered.append(lox_token)
+            self.types.append(lox_token.type.value)
+
+    def trim(self, index: int) -> None:
+        del self.buffered[:index]
+        del self.types[:index]
+
+    def token(self, index: int) -> Token:
+        return self.buffered[index]
@@ -92,5 +92,11 @@ class TokenType:
     def __init__(self, type_value: int):
         self.value: int = type_value
 
+    def __reduce__(self):
+        # Unpickle to the shared instance, types are compared with "is".
+        import token_type_instances
+
+        return (token_type_instances.instance, (self.value,))
+
     def __str__(self):
         return self.name_list[self.value]
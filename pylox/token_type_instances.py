@@ -10,7 +10,7 @@ only instantiate them once in this file and then pass their reference around.
 LEFT_PAREN = TokenType(TokenType.LEFT_PAREN)
 RIGHT_PAREN = TokenType(TokenType.RIGHT_PAREN)
 LEFT_BRACE = TokenType(TokenType.LEFT_BRACE)
-RIGHT_BRACE = TokenType(TokenType.RIGHT_PAREN)
+RIGHT_BRACE = TokenType(TokenType.RIGHT_BRACE)
 COMMA = TokenType(TokenType.COMMA)
 DOT = TokenType(TokenType.DOT)
 MINUS = TokenType(TokenType.MINUS)
@@ -53,3 +53,50 @@ VAR = TokenType(TokenType.VAR)
 WHILE = TokenType(TokenType.WHILE)
 
 EOF = TokenType(TokenType.EOF)
+
+# Instances indexed by their value, to turn stored type codes back into types.
+by_value: list[TokenType] = [
+    LEFT_PAREN,
+    RIGHT_PAREN,
+    LEFT_BRACE,
+    RIGHT_BRACE,
+    COMMA,
+    DOT,
+    MINUS,
+    PLUS,
+    SEMICOLON,
+    SLASH,
+    STAR,
+    BANG,
+    BANG_EQUAL,
+    EQUAL,
+    EQUAL_EQUAL,
+    GREATER,
+    GREATER_EQUAL,
+    LESS,
+    LESS_EQUAL,
+    IDENTIFIER,
+    STRING,
+    NUMBER,
+    AND,
+    CLASS,
+    ELSE,
+    FALSE,
+    FUN,
+    FOR,
+    IF,
+    NIL,
+    OR,
+    PRINT,
+    RETURN,
+    SUPER,
+    THIS,
+    TRUE,
+    VAR,
+    WHILE,
+    EOF,
+]
+
+
+def instance(type_value: int) -> TokenType:
+    return by_value[type_value]
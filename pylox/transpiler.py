@@ -0,0 +1,458 @@
+import math
+import error
+import expr
+import stmt
+import token_type_instances as TT
+from expr import Expr
+from stmt import Stmt
+from token_class import Token
+from lox_callable import LoxCallable
+
+PRELUDE = """\
+# Generated by the pylox transpiler.
+from transpiler import TranspiledFunction as _Function, call_value as _call
+from transpiler import run_main as _run
+from rope import STRINGS as _Strings, concat as _concat
+from error import line_runtime_error as _error
+from expr import stringify as _stringify
+import env as _env
+import output as _output
+import lox_callable  # defines the natives of natives.py in the default globals
+
+G = _env.state.get().globals.values
+"""
+
+EPILOGUE = """
+# Lox line of each generated line that makes a call, for stack overflows.
+_CALL_LINES = {call_lines}
+
+if __name__ == "__main__":
+    _run(_main, _CALL_LINES)
+"""
+
+
+class TranspiledFunction(LoxCallable):
+    def __init__(self, name: str, arity: int, function) -> None:
+        self.name: str = name
+        self.param_count: int = arity
+        self.function = function
+
+    def call(self, arguments: list[object]) -> object:
+        return self.function(*arguments)
+
+    def arity(self) -> int:
+        return self.param_count
+
+    def __str__(self) -> str:
+        return "<fn " + self.name + ">"
+
+
+def run_main(main, call_lines: dict[int, int]) -> None:
+    try:
+        main()
+    except RecursionError as overflow:
+        # Report the innermost Lox call found in the traceback.
+        filename = main.__code__.co_filename
+        line: int | None = None
+        traceback = overflow.__traceback__
+        while traceback is not None:
+            code = traceback.tb_frame.f_code
+            if code.co_filename == filename and traceback.tb_lineno in call_lines:
+                line = call_lines[traceback.tb_lineno]
+            traceback = traceback.tb_next
+        if line is None:
+            error.report_recursion()
+            raise RuntimeError
+        raise error.line_runtime_error(line, "Stack overflow.")
+
+
+def call_value(callee: object, arguments: list[object], line: int) -> object:
+    if not isinstance(callee, LoxCallable):
+        raise error.line_runtime_error(line, "Can only call functions and classes.")
+
+    if len(arguments) != callee.arity():
+        error_str = "Expected " + str(callee.arity()) + " arguments but got "
+        error_str = error_str + str(len(arguments)) + "."
+        raise error.line_runtime_error(line, error_str)
+
+    try:
+        return callee.call(arguments)
+    except error.NativeError as native:
+        raise error.line_runtime_error(line, native.args[0])
+
+
+class Transpiler:
+    """
+    Translates a resolved program into Python source. Expressions are
+    flattened into statements over temporaries (_t0, _t1, ...) so Lox
+    evaluation order and operand checks are kept exactly. Lox locals become
+    Python fast locals, renamed to be unique; Lox globals live in G, which
+    are the values of env.state's globals.
+    """
+
+    comparisons: dict[int, str] = {
+        TT.GREATER.value: ">",
+        TT.GREATER_EQUAL.value: ">=",
+        TT.LESS.value: "<",
+        TT.LESS_EQUAL.value: "<=",
+    }
+
+    arithmetic: dict[int, str] = {
+        TT.MINUS.value: "-",
+        TT.SLASH.value: "/",
+        TT.STAR.value: "*",
+    }
+
+    def __init__(self) -> None:
+        self.lines: list[str] = []
+        self.indent: int = 0
+        self.counter: int = 0
+        self.scopes: list[dict[str, str]] = []
+        self.local_names: set[str] = set()
+        self.call_lines: dict[int, int] = {}
+
+    def transpile(self, statements: list[Stmt]) -> str:
+        self.lines = [PRELUDE]
+        self.emit("def _main():")
+        self.indent += 1
+        self.body(statements)
+        self.indent -= 1
+        self.lines.append(EPILOGUE.format(call_lines=repr(self.call_lines)))
+        return "\n".join(self.lines)
+
+    # ------------------------- EMITTING -------------------------
+
+    def emit(self, line: str) -> None:
+        self.lines.append("    " * self.indent + line)
+
+    def python_line(self) -> int:
+        # Line number of the last emitted line, the prelude comes first.
+        return PRELUDE.count("\n") + len(self.lines)
+
+    def body(self, statements: list[Stmt]) -> None:
+        # Python needs at least one statement in every suite.
+        start = len(self.lines)
+        for statement in statements:
+            self.statement(statement)
+        if len(self.lines) == start:
+            self.emit("pass")
+
+    def unique(self, prefix: str) -> str:
+        self.counter += 1
+        return prefix + str(self.counter)
+
+    def temp(self, code: str) -> str:
+        name = self.unique("_t")
+        self.emit(name + " = " + code)
+        return name
+
+    def error(self, line: int, message: str) -> str:
+        return "_error(" + str(line) + ", " + repr(message) + ")"
+
+    # ------------------------- VARIABLES -------------------------
+
+    def declare(self, name: Token) -> str:
+        python_name = self.unique(name.lexeme + "_")
+        self.scopes[-1][name.lexeme] = python_name
+        self.local_names.add(python_name)
+        return python_name
+
+    def local_name(self, name: Token) -> str:
+        for scope in reversed(self.scopes):
+            if name.lexeme in scope:
+                return scope[name.lexeme]
+
+        raise KeyError(name.lexeme)
+
+    def store(self, name: Token, depth: int | None, code: str) -> None:
+        if depth is None:
+            key = repr(name.lexeme)
+            message = "Undefined variable '" + name.lexeme + "'."
+            self.emit("if " + key + " not in G:")
+            self.emit("    " + self.error(name.line, message))
+            self.emit("G[" + key + "] = " + code)
+        else:
+            self.emit(self.local_name(name) + " = " + code)
+
+    def define(self, name: Token, code: str) -> None:
+        if len(self.scopes) == 0:
+            self.emit("G[" + repr(name.lexeme) + "] = " + code)
+        else:
+            self.emit(self.declare(name) + " = " + code)
+
+    # ------------------------- STATEMENTS -------------------------
+
+    def statement(self, statement: Stmt) -> None:
+        match statement:
+            case stmt.ExpressionStmt():
+                self.operand(statement.expression)
+            case stmt.Print():
+                code = self.operand(statement.expression)
+                self.emit("_output.sink.get().write_line(_stringify(" + code + "))")
+            case stmt.Var():
+                code = "None"
+                if statement.initializer is not None:
+                    code = self.operand(statement.initializer)
+                self.define(statement.name, code)
+            case stmt.Block():
+                self.scopes.append({})
+                for inner in statement.statements:
+                    self.statement(inner)
+                self.scopes.pop()
+            case stmt.If():
+                self.emit("if " + self.condition(statement.condition) + ":")
+                self.indent += 1
+                self.body([statement.then_branch])
+                self.indent -= 1
+                if statement.else_branch is not None:
+                    self.emit("else:")
+                    self.indent += 1
+                    self.body([statement.else_branch])
+                    self.indent -= 1
+            case stmt.While():
+                self.emit("while True:")
+                self.indent += 1
+                self.emit("if not " + self.condition(statement.condition) + ":")
+                self.emit("    break")
+                self.body([statement.body])
+                self.indent -= 1
+            case stmt.For():
+                self.scopes.append({})
+                if statement.initializer is not None:
+                    self.statement(statement.initializer)
+                self.emit("while True:")
+                self.indent += 1
+                if statement.condition is not None:
+                    self.emit("if not " + self.condition(statement.condition) + ":")
+                    self.emit("    break")
+                self.body([statement.body])
+                if statement.increment is not None:
+                    self.operand(statement.increment)
+                self.indent -= 1
+                self.scopes.pop()
+            case stmt.Return():
+                code = "None"
+                if statement.value is not None:
+                    code = self.operand(statement.value)
+                self.emit("return " + code)
+            case stmt.Function():
+                self.function(statement)
+
+    def function(self, declaration: stmt.Function) -> None:
+        python_name = self.unique("_fn")
+
+        enclosing = self.scopes
+        self.scopes = [{}]
+        params = [self.declare(param) for param in declaration.params]
+        self.emit("def " + python_name + "(" + ", ".join(params) + "):")
+        self.indent += 1
+        for inner in declaration.body:
+            self.statement(inner)
+        self.emit("return None")
+        self.indent -= 1
+        self.scopes = enclosing
+
+        name = declaration.name.lexeme
+        arity = str(len(declaration.params))
+        self.define(
+            declaration.name,
+            "_Function(" + repr(name) + ", " + arity + ", " + python_name + ")",
+        )
+
+    def condition(self, condition: Expr) -> str:
+        while isinstance(condition, expr.Grouping):
+            condition = condition.expression
+
+        # Comparisons already produce a bool, no truthiness test needed.
+        if isinstance(condition, expr.Binary):
+            symbol = self.comparisons.get(condition.operator.type.value)
+            if symbol is not None:
+                left, right = self.number_operands(condition)
+                return "(" + left + " " + symbol + " " + right + ")"
+
+        code = self.operand(condition)
+        return "(" + code + " is not None and " + code + " is not False)"
+
+    # ------------------------- EXPRESSIONS -------------------------
+
+    def is_simple(self, expression: Expr) -> bool:
+        # Simple operands can't run code or fail when evaluated.
+        while isinstance(expression, expr.Grouping):
+            expression = expression.expression
+
+        if isinstance(expression, expr.Variable):
+            return expression.depth is not None
+
+        return isinstance(expression, expr.Literal)
+
+    def stable(self, code: str) -> str:
+        # Local variable names may be reassigned by a later operand.
+        if code in self.local_names:
+            return self.temp(code)
+        return code
+
+    def operands(self, expressions: list[Expr]) -> list[str]:
+        codes: list[str] = []
+        for i in range(len(expressions)):
+            if not self.is_simple(expressions[i]):
+                codes = [self.stable(code) for code in codes]
+            codes.append(self.operand(expressions[i]))
+
+        return codes
+
+    def check_numbers(self, operator: Token, codes: list[str], message: str) -> None:
+        # Number literals don't need a runtime check.
+        checks = [
+            "not isinstance(" + code + ", float)"
+            for code in codes
+            if not code[0].isdigit() and not code.startswith("float(")
+        ]
+        if len(checks) > 0:
+            self.emit("if " + " or ".join(checks) + ":")
+            self.emit("    " + self.error(operator.line, message))
+
+    def number_operands(self, expression: expr.Binary) -> tuple[str, str]:
+        left, right = self.operands([expression.left, expression.right])
+        message = "Operands must be a number."
+        self.check_numbers(expression.operator, [left, right], message)
+        return left, right
+
+    def operand(self, expression: Expr) -> str:
+        match expression:
+            case expr.Literal():
+                return self.literal(expression.value)
+            case expr.Grouping():
+                return self.operand(expression.expression)
+            case expr.Variable():
+                if expression.depth is not None:
+                    return self.local_name(expression.name)
+                name = expression.name
+                result = self.unique("_t")
+                message = "Undefined variable '" + name.lexeme + "'."
+                self.emit("try:")
+                self.emit("    " + result + " = G[" + repr(name.lexeme) + "]")
+                self.emit("except KeyError:")
+                self.emit("    " + self.error(name.line, message))
+                return result
+            case expr.Assign():
+                code = self.stable(self.operand(expression.value))
+                self.store(expression.name, expression.depth, code)
+                return code
+            case expr.Binary():
+                return self.binary(expression)
+            case expr.Unary():
+                right = self.operand(expression.right)
+                if expression.operator.type is TT.BANG:
+                    return self.temp(
+                        "(" + right + " is None or " + right + " is False)"
+                    )
+                message = "Operand must be a number."
+                self.check_numbers(expression.operator, [right], message)
+                return self.temp("0 - " + right)
+            case expr.Logical():
+                result = self.temp(self.operand(expression.left))
+                if expression.operator.type is TT.OR:
+                    self.emit("if " + result + " is None or " + result + " is False:")
+                else:
+                    self.emit(
+                        "if " + result + " is not None and " + result + " is not False:"
+                    )
+                self.indent += 1
+                self.emit(result + " = " + self.operand(expression.right))
+                self.indent -= 1
+                return result
+            case expr.Call():
+                return self.call(expression)
+
+        raise ValueError(
+            "Unknown expression type '" + expression.__class__.__name__ + "'."
+        )
+
+    def literal(self, value: object) -> str:
+        if isinstance(value, float) and not math.isfinite(value):
+            return "float(" + repr(repr(value)) + ")"
+
+        return repr(value)
+
+    def binary(self, expression: expr.Binary) -> str:
+        operator_type = expression.operator.type.value
+
+        symbol = self.comparisons.get(operator_type) or self.arithmetic.get(
+            operator_type
+        )
+        if symbol is not None:
+            left, right = self.number_operands(expression)
+            return self.temp(left + " " + symbol + " " + right)
+
+        left, right = self.operands([expression.left, expression.right])
+        if expression.operator.type is TT.EQUAL_EQUAL:
+            return self.temp(left + " == " + right)
+        if expression.operator.type is TT.BANG_EQUAL:
+            return self.temp(left + " != " + right)
+
+        # PLUS: two numbers or two strings.
+        message = "Operands must be two numbers or two strings."
+        self.emit(
+            "if not ((isinstance("
+            + left
+            + ", float) and isinstance("
+            + right
+            + ", float)) or (isinstance("
+            + left
+            + ", _Strings) and isinstance("
+            + right
+            + ", _Strings))):"
+        )
+        self.emit("    " + self.error(expression.operator.line, message))
+        result = self.unique("_t")
+        self.emit("if isinstance(" + left + ", float):")
+        self.emit("    " + result + " = " + left + " + " + right)
+        self.emit("else:")
+        self.emit("    " + result + " = _concat(" + left + ", " + right + ")")
+        return result
+
+    def call(self, expression: expr.Call) -> str:
+        codes = self.operands([expression.callee] + expression.arguments)
+        callee = codes[0]
+        if not callee.startswith("_t"):
+            callee = self.temp(callee)
+        arguments = ", ".join(codes[1:])
+        arity = str(len(expression.arguments))
+        line = str(expression.paren.line)
+
+        result = self.unique("_t")
+        self.emit(
+            "if "
+            + callee
+            + ".__class__ is _Function and "
+            + callee
+            + ".param_count == "
+            + arity
+            + ":"
+        )
+        self.emit("    " + result + " = " + callee + ".function(" + arguments + ")")
+        self.call_lines[self.python_line()] = expression.paren.line
+        self.emit("else:")
+        self.emit(
+            "    "
+            + result
+            + " = _call("
+            + callee
+            + ", ["
+            + arguments
+            + "], "
+            + line
+            + ")"
+        )
+        self.call_lines[self.python_line()] = expression.paren.line
+        return result
+
+
+def transpile(statements: list[Stmt]) -> str:
+    return Transpiler().transpile(statements)
+
+
+def execute(source: str, filename: str = "<lox>") -> None:
+    namespace: dict[str, object] = {"__name__": "lox_program"}
+    exec(compile(source, filename, "exec"), namespace)
+    run_main(namespace["_main"], namespace["_CALL_LINES"])  # type: ignore
@@ -0,0 +1,384 @@
+import error
+import env
+import output
+import expr
+from chunk_class import Chunk
+from lox_callable import LoxCallable
+from rope import STRINGS, concat
+from op_code import (
+    CONSTANT,
+    NIL,
+    TRUE,
+    FALSE,
+    POP,
+    POPN,
+    GET_LOCAL,
+    SET_LOCAL,
+    GET_GLOBAL,
+    SET_GLOBAL,
+    DEFINE_GLOBAL,
+    EQUAL,
+    NOT_EQUAL,
+    GREATER,
+    GREATER_EQUAL,
+    LESS,
+    LESS_EQUAL,
+    ADD,
+    SUBTRACT,
+    MULTIPLY,
+    DIVIDE,
+    NOT,
+    NEGATE,
+    PRINT,
+    JUMP,
+    JUMP_IF_FALSE,
+    JUMP_IF_TRUE,
+    POP_JUMP_IF_FALSE,
+    CALL,
+    RETURN,
+    STORE_LOCAL,
+    STORE_GLOBAL,
+    JUMP_IF_NOT_LESS,
+    JUMP_IF_NOT_LESS_EQUAL,
+    JUMP_IF_NOT_GREATER,
+    JUMP_IF_NOT_GREATER_EQUAL,
+)
+
+# Lox calls don't nest Python calls here, frames live in VM.frames, so
+# recursion is only limited by this budget on the memory the frames and the
+# value stack take (approximately: a CallFrame and a stack slot are counted
+# at their size on a 64-bit build).
+stack_budget: int = 256 * 1024 * 1024
+FRAME_BYTES = 72
+SLOT_BYTES = 8
+
+# Returned by VM.run when it ran out of fuel before the program finished.
+SUSPENDED = object()
+
+
+class VMFunction(LoxCallable):
+    def __init__(self, name: str, arity: int) -> None:
+        self.name: str = name
+        self.param_count: int = arity
+        self.chunk: Chunk = Chunk()
+
+    def call(self, arguments: list[object]) -> object:
+        return VM().call(self, arguments)
+
+    def arity(self) -> int:
+        return self.param_count
+
+    def __str__(self) -> str:
+        if self.name == "script":
+            return "<script>"
+        return "<fn " + self.name + ">"
+
+
+class CallFrame:
+    __slots__ = ("function", "ip", "base")
+
+    def __init__(self, function: VMFunction, base: int) -> None:
+        self.function: VMFunction = function
+        self.ip: int = 0
+        # Stack index of the frame's first local (its first parameter).
+        self.base: int = base
+
+
+class VM:
+    """
+    Stack machine executing the bytecode produced by compiler.py. Globals
+    are shared with the tree-walking interpreter through env.state, so
+    native functions are visible to both backends.
+    """
+
+    def __init__(self) -> None:
+        self.stack: list[object] = []
+        self.frames: list[CallFrame] = []
+        self.globals: dict[str, object] = env.state.get().globals.values
+
+    def interpret(self, function: VMFunction) -> None:
+        self.call(function, [])
+
+    def call(self, function: VMFunction, arguments: list[object]) -> object:
+        self.enter(function, arguments)
+        return self.run()
+
+    def enter(self, function: VMFunction, arguments: list[object]) -> None:
+        # Sets up the call without running it.
+        self.stack.append(function)
+        self.stack.extend(arguments)
+        self.frames.append(CallFrame(function, len(self.stack) - len(arguments)))
+
+    def run(self, fuel: int = -1) -> object:
+        """
+        Runs until the outermost call returns. With a positive fuel, each
+        jump and call takes one, these being the only ways back to code
+        already run, and the VM returns SUSPENDED when none is left. The
+        next run() carries on where it stopped.
+        """
+        stack = self.stack
+        frames = self.frames
+        push = stack.append
+        pop = stack.pop
+        global_values = self.globals
+        budget = stack_budget
+
+        frame = frames[-1]
+        chunk = frame.function.chunk
+        code = chunk.code
+        constants = chunk.constants
+        names = chunk.names
+        base = frame.base
+        ip = frame.ip
+
+        while True:
+            op = code[ip]
+            ip += 1
+
+            if op == GET_LOCAL:
+                push(stack[base + code[ip]])
+                ip += 1
+            elif op == CONSTANT:
+                push(constants[code[ip]])
+                ip += 1
+            elif op == STORE_LOCAL:
+                stack[base + code[ip]] = pop()
+                ip += 1
+            elif op == ADD:
+                right = pop()
+                left = stack[-1]
+                if isinstance(left, float) and isinstance(right, float):
+                    stack[-1] = left + right
+                elif isinstance(left, STRINGS) and isinstance(right, STRINGS):
+                    stack[-1] = concat(left, right)
+                else:
+                    self.error(
+                        chunk, ip, "Operands must be two numbers or two strings."
+                    )
+            elif op == JUMP:
+                ip = code[ip]
+                fuel -= 1
+                if fuel == 0:
+                    frame.ip = ip
+                    return SUSPENDED
+            elif op == JUMP_IF_NOT_LESS:
+                right = pop()
+                left = pop()
+                if isinstance(left, float) and isinstance(right, float):
+                    if left < right:
+                        ip += 1
+                    else:
+                        ip = code[ip]
+                else:
+                    self.error(chunk, ip, "Operands must be a number.")
+            elif op == GET_GLOBAL:
+                name = names[code[ip]]
+                ip += 1
+                try:
+                    push(global_values[name])
+                except KeyError:
+                    self.error(chunk, ip, "Undefined variable '" + name + "'.")
+            elif op == CALL:
+                arg_count = code[ip]
+                ip += 1
+                callee = stack[-1 - arg_count]
+                if isinstance(callee, VMFunction):
+                    if arg_count != callee.param_count:
+                        self.arity_error(chunk, ip, callee.param_count, arg_count)
+                    if len(frames) * FRAME_BYTES + len(stack) * SLOT_BYTES > budget:
+                        self.error(chunk, ip, "Stack overflow.")
+
+                    frame.ip = ip
+                    frame = CallFrame(callee, len(stack) - arg_count)
+                    frames.append(frame)
+                    chunk = callee.chunk
+                    code = chunk.code
+                    constants = chunk.constants
+                    names = chunk.names
+                    base = frame.base
+                    ip = 0
+                    fuel -= 1
+                    if fuel == 0:
+                        return SUSPENDED
+                elif isinstance(callee, LoxCallable):
+                    if arg_count != callee.arity():
+                        self.arity_error(chunk, ip, callee.arity(), arg_count)
+
+                    arguments = stack[len(stack) - arg_count :]
+                    del stack[len(stack) - arg_count - 1 :]
+                    try:
+                        push(callee.call(arguments))
+                    except error.NativeError as native:
+                        self.error(chunk, ip, native.args[0])
+                else:
+                    self.error(chunk, ip, "Can only call functions and classes.")
+            elif op == RETURN:
+                result = pop()
+                del stack[base - 1 :]
+                frames.pop()
+                if len(frames) == 0:
+                    return result
+
+                push(result)
+                frame = frames[-1]
+                chunk = frame.function.chunk
+                code = chunk.code
+                constants = chunk.constants
+                names = chunk.names
+                base = frame.base
+                ip = frame.ip
+            elif op == POP:
+                pop()
+            elif op == POP_JUMP_IF_FALSE:
+                value = pop()
+                if value is None or value is False:
+                    ip = code[ip]
+                else:
+                    ip += 1
+            elif op == SUBTRACT:
+                right = pop()
+                left = stack[-1]
+                if isinstance(left, float) and isinstance(right, float):
+                    stack[-1] = left - right
+                else:
+                    self.error(chunk, ip, "Operands must be a number.")
+            elif op == MULTIPLY:
+                right = pop()
+                left = stack[-1]
+                if isinstance(left, float) and isinstance(right, float):
+                    stack[-1] = left * right
+                else:
+                    self.error(chunk, ip, "Operands must be a number.")
+            elif op == JUMP_IF_NOT_GREATER:
+                right = pop()
+                left = pop()
+                if isinstance(left, float) and isinstance(right, float):
+                    if left > right:
+                        ip += 1
+                    else:
+                        ip = code[ip]
+                else:
+                    self.error(chunk, ip, "Operands must be a number.")
+            elif op == JUMP_IF_NOT_LESS_EQUAL:
+                right = pop()
+                left = pop()
+                if isinstance(left, float) and isinstance(right, float):
+                    if left <= right:
+                        ip += 1
+                    else:
+                        ip = code[ip]
+                else:
+                    self.error(chunk, ip, "Operands must be a number.")
+            elif op == JUMP_IF_NOT_GREATER_EQUAL:
+                right = pop()
+                left = pop()
+                if isinstance(left, float) and isinstance(right, float):
+                    if left >= right:
+                        ip += 1
+                    else:
+                        ip = code[ip]
+                else:
+                    self.error(chunk, ip, "Operands must be a number.")
+            elif op == STORE_GLOBAL:
+                name = names[code[ip]]
+                ip += 1
+                if name in global_values:
+                    global_values[name] = pop()
+                else:
+                    self.error(chunk, ip, "Undefined variable '" + name + "'.")
+            elif op == NIL:
+                push(None)
+            elif op == EQUAL:
+                right = pop()
+                stack[-1] = expr.is_equal(stack[-1], right)
+            elif op == NOT_EQUAL:
+                right = pop()
+                stack[-1] = not expr.is_equal(stack[-1], right)
+            elif op == LESS:
+                right = pop()
+                left = stack[-1]
+                if isinstance(left, float) and isinstance(right, float):
+                    stack[-1] = left < right
+                else:
+                    self.error(chunk, ip, "Operands must be a number.")
+            elif op == GREATER:
+                right = pop()
+                left = stack[-1]
+                if isinstance(left, float) and isinstance(right, float):
+                    stack[-1] = left > right
+                else:
+                    self.error(chunk, ip, "Operands must be a number.")
+            elif op == LESS_EQUAL:
+                right = pop()
+                left = stack[-1]
+                if isinstance(left, float) and isinstance(right, float):
+                    stack[-1] = left <= right
+                else:
+                    self.error(chunk, ip, "Operands must be a number.")
+            elif op == GREATER_EQUAL:
+                right = pop()
+                left = stack[-1]
+                if isinstance(left, float) and isinstance(right, float):
+                    stack[-1] = left >= right
+                else:
+                    self.error(chunk, ip, "Operands must be a number.")
+            elif op == DIVIDE:
+                right = pop()
+                left = stack[-1]
+                if isinstance(left, float) and isinstance(right, float):
+                    stack[-1] = left / right
+                else:
+                    self.error(chunk, ip, "Operands must be a number.")
+            elif op == SET_LOCAL:
+                stack[base + code[ip]] = stack[-1]
+                ip += 1
+            elif op == SET_GLOBAL:
+                name = names[code[ip]]
+                ip += 1
+                if name in global_values:
+                    global_values[name] = stack[-1]
+                else:
+                    self.error(chunk, ip, "Undefined variable '" + name + "'.")
+            elif op == PRINT:
+                output.sink.get().write_line(expr.stringify(pop()))
+            elif op == TRUE:
+                push(True)
+            elif op == FALSE:
+                push(False)
+            elif op == POPN:
+                del stack[len(stack) - code[ip] :]
+                ip += 1
+            elif op == JUMP_IF_FALSE:
+                value = stack[-1]
+                if value is None or value is False:
+                    ip = code[ip]
+                else:
+                    ip += 1
+            elif op == JUMP_IF_TRUE:
+                value = stack[-1]
+                if value is None or value is False:
+                    ip += 1
+                else:
+                    ip = code[ip]
+            elif op == NOT:
+                value = stack[-1]
+                stack[-1] = value is None or value is False
+            elif op == NEGATE:
+                value = stack[-1]
+                if isinstance(value, float):
+                    stack[-1] = 0 - value
+                else:
+                    self.error(chunk, ip, "Operand must be a number.")
+            elif op == DEFINE_GLOBAL:
+                global_values[names[code[ip]]] = pop()
+                ip += 1
+
+    def error(self, chunk: Chunk, ip: int, message: str) -> None:
+        self.stack.clear()
+        self.frames.clear()
+        raise error.line_runtime_error(chunk.lines[ip - 1], message)
+
+    def arity_error(self, chunk: Chunk, ip: int, arity: int, arg_count: int) -> None:
+        error_str = "Expected " + str(arity) + " arguments but got "
+        error_str = error_str + str(arg_count) + "."
+        self.error(chunk, ip, error_str)